@@ -0,0 +1,20 @@
+"""
+gunicorn 設定（Procfile 與 Dockerfile 共用，gunicorn 啟動時自動載入目前目錄下的此檔案）
+
+群組、統計與歷史記錄都存在行程記憶體中，配置文件也只有單一寫入者，
+因此固定使用 1 個 worker；對外 Webhook 請求屬於 I/O 等待，以 gthread 執行緒處理並行
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 16))
+
+# 圖片上傳 + 多個 Webhook 發送可能超過預設的 30 秒
+timeout = 120
+
+# 反向代理後方保持連線，減少重複建立 TCP 連線
+keepalive = 30
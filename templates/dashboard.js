@@ -0,0 +1,723 @@
+const baseUrl = window.location.origin;
+let openGroups = new Set();
+let openSchedulePanels = new Set();
+let inputStates = {};
+let latestGroups = [];
+let isUserInteracting = false;
+let lastInteractionTime = 0;
+
+document.addEventListener('DOMContentLoaded', function() {
+    document.body.addEventListener('mousedown', () => { isUserInteracting = true; lastInteractionTime = Date.now(); });
+    document.body.addEventListener('keydown', () => { isUserInteracting = true; lastInteractionTime = Date.now(); });
+    document.body.addEventListener('focus', (e) => {
+        if (e.target.matches('input, select, textarea')) { isUserInteracting = true; lastInteractionTime = Date.now(); }
+    }, true);
+    setInterval(() => { if (Date.now() - lastInteractionTime > 5000) isUserInteracting = false; }, 500);
+    loadFeishuCredentials();
+});
+
+// 右下角提示（不使用 alert，避免阻塞頁面與進行中的請求）
+let toastTimer = null;
+function showToast(message, isError = false) {
+    const el = document.getElementById('saveIndicator');
+    el.textContent = message;
+    el.classList.toggle('error', isError);
+    el.style.display = 'block';
+    clearTimeout(toastTimer);
+    toastTimer = setTimeout(() => el.style.display = 'none', 2000);
+}
+
+function showSave() { showToast('已保存'); }
+
+function saveInputStates() {
+    inputStates = {};
+    ['newGroupId', 'newGroupName'].forEach(id => {
+        const el = document.getElementById(id);
+        if (el) inputStates[id] = el.value;
+    });
+    document.querySelectorAll('[id^="wn-"], [id^="wu-"], [id^="sd-"], [id^="ss-"], [id^="se-"]').forEach(el => { inputStates[el.id] = el.value; });
+    document.querySelectorAll('[id^="wt-"]').forEach(el => { inputStates[el.id] = el.value; });
+    document.querySelectorAll('[id^="wf-"]').forEach(el => { inputStates[el.id] = el.checked; });
+}
+
+function restoreInputStates() {
+    for (const [id, val] of Object.entries(inputStates)) {
+        const el = document.getElementById(id);
+        if (el) { el.type === 'checkbox' ? el.checked = val : el.value = val; }
+    }
+}
+
+function savePanelStates() {
+    openSchedulePanels.clear();
+    document.querySelectorAll('[id^="sp-"]').forEach(box => {
+        if (box.style.display !== 'none') openSchedulePanels.add(box.id.replace('sp-', ''));
+    });
+}
+
+function restorePanelStates() {
+    openSchedulePanels.forEach(id => {
+        const box = document.getElementById('sp-' + id);
+        if (box) box.style.display = 'block';
+    });
+}
+
+// 統計欄位 -> 文字節點（腳本以 defer 載入，執行時 DOM 已就緒，只查找一次）
+const STATS_EL = {};
+for (const [id, key] of [
+    ['uptime', 'uptime'], ['totalGroups', 'total_groups'], ['totalReceived', 'total_received'],
+    ['totalSent', 'total_sent'], ['totalFailed', 'total_failed'], ['successRate', 'success_rate'],
+    ['configFile', 'config_file'], ['timezone', 'timezone'], ['currentTime', 'current_time']
+]) {
+    STATS_EL[key] = document.getElementById(id).firstChild;
+}
+
+function updateStatsOnly(data) {
+    // 直接寫入文字節點，數值未變時跳過以免觸發重新排版
+    for (const key in STATS_EL) {
+        const node = STATS_EL[key];
+        const value = String(data[key] ?? '-');
+        if (node.nodeValue !== value) node.nodeValue = value;
+    }
+}
+
+// 運行時間與目前時間由瀏覽器每秒推算，不必為了時鐘重新載入統計
+let clockBase = null;  // { uptime, serverMs, at }：最後一次回應的伺服器時間與收到時刻
+function syncClock(data) {
+    if (data.uptime_seconds == null || !data.current_time) return;
+    clockBase = {
+        uptime: data.uptime_seconds,
+        serverMs: Date.parse(data.current_time.replace(' ', 'T') + 'Z'),  // 以 UTC 解析，照原時區格式輸出
+        at: performance.now()
+    };
+}
+function tickClock() {
+    if (!clockBase) return;
+    const elapsed = Math.floor((performance.now() - clockBase.at) / 1000);
+    const up = clockBase.uptime + elapsed;
+    const uptime = Math.floor(up / 3600) + 'h ' + Math.floor(up % 3600 / 60) + 'm ' + (up % 60) + 's';
+    const now = new Date(clockBase.serverMs + elapsed * 1000).toISOString().slice(0, 19).replace('T', ' ');
+    if (STATS_EL.uptime.nodeValue !== uptime) STATS_EL.uptime.nodeValue = uptime;
+    if (STATS_EL.current_time.nodeValue !== now) STATS_EL.current_time.nodeValue = now;
+}
+setInterval(tickClock, 1000);
+
+let statsAbort = null;
+let fullLoadPending = false;  // 完整載入進行中（推送事件等它完成後再比對版本）
+let renderedVersion = null;   // 最後一次完整載入的狀態版本
+let eventVersion = null;      // 完整載入進行中收到的推送版本
+async function loadData(forceRender = false) {
+    // 使用者操作中只更新頂部統計，改抓不含群組明細的精簡版
+    const summaryOnly = isUserInteracting && !forceRender;
+    // 上一次請求尚未完成：精簡版直接略過，完整版取消舊請求改抓最新資料，避免回應堆積或亂序
+    if (statsAbort) {
+        if (summaryOnly) return;
+        statsAbort.abort();
+    }
+    const controller = new AbortController();
+    statsAbort = controller;
+    fullLoadPending = !summaryOnly;
+    try {
+        const res = await fetch(summaryOnly ? '/api/stats?summary=1' : '/api/stats', { signal: controller.signal });
+        const data = await res.json();
+        syncClock(data);
+        if (summaryOnly) { updateStatsOnly(data); return; }
+        const unchanged = !forceRender && data.version === renderedVersion;
+        renderedVersion = data.version;
+        if (unchanged) { updateStatsOnly(data); return; }  // 狀態未變（例如輪詢）：不重繪群組
+        latestGroups = data.groups || [];
+        scheduleRender(data);
+    } catch (e) {
+        if (e.name !== 'AbortError') console.error(e);
+    } finally {
+        if (statsAbort === controller) {
+            statsAbort = null;
+            fullLoadPending = false;
+            // 載入期間收到的推送版本與剛載入的不同時再載入一次
+            const pending = eventVersion;
+            eventVersion = null;
+            if (pending !== null && pending !== renderedVersion) scheduleReload();
+        }
+    }
+}
+
+// 推送事件：版本與畫面相同時略過；完整載入進行中時等它完成再比對，不中斷（例如預載的首次請求）
+function onStateEvent(version) {
+    if (version === renderedVersion) return;
+    if (fullLoadPending) { eventVersion = version; return; }
+    scheduleReload();
+}
+
+// 短時間內的多次重新載入（連續操作、操作後的推送事件）合併為一次 /api/stats 請求
+let reloadTimer = null;
+let reloadForce = false;
+function scheduleReload(forceRender = false) {
+    reloadForce = reloadForce || forceRender;
+    if (reloadTimer) return;
+    reloadTimer = setTimeout(() => {
+        const force = reloadForce;
+        reloadTimer = null;
+        reloadForce = false;
+        loadData(force);
+    }, 50);
+}
+
+// 同一動畫幀內多次 loadData 只渲染最後一份資料
+let pendingRender = null;
+function scheduleRender(data) {
+    const queued = pendingRender !== null;
+    pendingRender = data;
+    if (queued) return;
+    requestAnimationFrame(() => {
+        const d = pendingRender;
+        pendingRender = null;
+        saveInputStates();
+        savePanelStates();
+        updateStatsOnly(d);
+        renderGroups(d.groups);
+        restoreInputStates();
+        restorePanelStates();
+    });
+}
+
+async function loadFeishuCredentials() {
+    try {
+        const res = await fetch('/api/feishu/credentials');
+        const data = await res.json();
+        document.getElementById('feishuAppId').value = data.app_id || '';
+        document.getElementById('feishuAppSecret').value = data.app_secret || '';
+        document.getElementById('feishuStatus').innerHTML = data.is_configured
+            ? '<span class="feishu-ok">已配置 (' + data.app_id_masked + ')</span>'
+            : '<span class="feishu-err">未配置</span>';
+    } catch (e) {}
+}
+
+async function updateFeishuCredentials() {
+    const appId = document.getElementById('feishuAppId').value.trim();
+    const appSecret = document.getElementById('feishuAppSecret').value.trim();
+    if (!appId || !appSecret) return showToast('請填寫完整', true);
+    const res = await (await fetch('/api/feishu/credentials', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ app_id: appId, app_secret: appSecret })
+    })).json();
+    if (res.success) { await loadFeishuCredentials(); showToast(res.message); }
+    else showToast(res.message, true);
+}
+
+function getTodayStr() {
+    const n = new Date();
+    return n.getFullYear() + '-' + String(n.getMonth()+1).padStart(2,'0') + '-' + String(n.getDate()).padStart(2,'0');
+}
+
+function formatDateShort(d) {
+    try { const dt = new Date(d + 'T00:00:00'); return (dt.getMonth()+1) + '/' + dt.getDate(); }
+    catch(e) { return d; }
+}
+
+function toggleGroup(groupId) {
+    if (openGroups.has(groupId)) openGroups.delete(groupId);
+    else openGroups.add(groupId);
+    // 收合的群組不產生內容，展開時以最近一次資料重建這張卡片
+    saveInputStates();
+    savePanelStates();
+    renderGroups(latestGroups);
+    restoreInputStates();
+    restorePanelStates();
+}
+
+function toggleSchedulePanel(webhookId) {
+    const box = document.getElementById('sp-' + webhookId);
+    if (box.style.display === 'none') { box.style.display = 'block'; openSchedulePanels.add(webhookId); }
+    else { box.style.display = 'none'; openSchedulePanels.delete(webhookId); }
+}
+
+function copyText(text) {
+    navigator.clipboard.writeText(text).then(() => showToast('已複製'), () => showToast('複製失敗', true));
+}
+
+function findWebhook(groupId, webhookId) {
+    const g = latestGroups.find(g => g.group_id === groupId);
+    return g ? g.webhooks.find(w => w.id === webhookId) : null;
+}
+
+// ====== 群組列表事件委派（依 data-action 分派） ======
+const CLICK_ACTIONS = {
+    toggleGroup: d => toggleGroup(d.groupId),
+    copyEndpoint: d => copyText(baseUrl + '/webhook/' + d.groupId),
+    setMode: d => setMode(d.groupId, d.mode),
+    addWebhook: d => addWebhook(d.groupId),
+    toggleFixed: d => toggleFixed(d.groupId, d.webhookId, d.fixed === 'true'),
+    toggleSchedulePanel: d => toggleSchedulePanel(d.webhookId),
+    renameWebhook: d => {
+        const w = findWebhook(d.groupId, d.webhookId);
+        if (w) renameWebhook(d.groupId, d.webhookId, w.name);
+    },
+    testWebhook: d => testWebhook(d.groupId, d.webhookId),
+    removeWebhook: d => removeWebhook(d.groupId, d.webhookId),
+    addScheduleItem: d => addScheduleItem(d.groupId, d.webhookId),
+    removeScheduleItem: d => removeScheduleItem(d.groupId, d.webhookId, Number(d.index)),
+    clearExpiredSchedules: d => clearExpiredSchedules(d.groupId, d.webhookId),
+    testGroup: d => testGroup(d.groupId),
+    deleteGroup: d => deleteGroup(d.groupId)
+};
+
+const CHANGE_ACTIONS = {
+    toggleWebhook: (d, el) => toggleWebhook(d.groupId, d.webhookId, el.checked),
+    toggleScheduleMode: (d, el) => toggleScheduleMode(d.groupId, d.webhookId, el.checked)
+};
+
+function bindGroupListActions() {
+    const list = document.getElementById('groupList');
+    const dispatch = actions => e => {
+        const el = e.target.closest('[data-action]');
+        if (!el || !list.contains(el)) return;
+        const handler = actions[el.dataset.action];
+        if (handler) handler(el.dataset, el);
+    };
+    list.addEventListener('click', dispatch(CLICK_ACTIONS));
+    list.addEventListener('change', dispatch(CHANGE_ACTIONS));
+}
+
+// ====== 渲染群組列表 ======
+// 發送模式 / Webhook 類型 -> 徽章樣式與文字（未知類型沿用企業微信）
+const MODE_BADGE = { sync: 'badge-sync', round_robin: 'badge-rr' };
+const TYPE_BADGE = {
+    discord: '<span class="badge badge-discord">Discord</span>',
+    feishu: '<span class="badge badge-feishu">飛書</span>',
+    wecom: '<span class="badge badge-wecom">企微</span>'
+};
+
+// group_id -> { html, el }：內容未變的群組卡片直接沿用既有節點
+const groupCards = new Map();
+
+function renderGroups(groups) {
+    const container = document.getElementById('groupList');
+    if (!groups || !groups.length) {
+        groupCards.clear();
+        container.innerHTML = '<div class="no-data">尚未建立任何群組</div>';
+        return;
+    }
+    const today = getTodayStr();
+
+    // 逐張比對產生的 HTML，只有內容變更的卡片才重建節點
+    const tpl = document.createElement('template');
+    const seen = new Set();
+    const cards = groups.map(g => {
+        const html = renderGroupCard(g, today);
+        seen.add(g.group_id);
+        const cached = groupCards.get(g.group_id);
+        if (cached && cached.html === html) return cached.el;
+        tpl.innerHTML = html;
+        const el = tpl.content.firstElementChild;
+        groupCards.set(g.group_id, { html, el });
+        return el;
+    });
+    for (const id of groupCards.keys()) {
+        if (!seen.has(id)) groupCards.delete(id);
+    }
+
+    // 卡片與順序都沒變時不碰 DOM
+    const current = container.children;
+    if (current.length === cards.length && cards.every((el, i) => current[i] === el)) return;
+    container.replaceChildren(...cards);
+}
+
+function renderGroupCard(g, today) {
+    return `
+        <div class="group-card">
+            <div class="group-header" data-action="toggleGroup" data-group-id="${g.group_id}">
+                <div class="group-title">
+                    <span>${g.display_name_html}</span>
+                    <span class="id">${g.group_id}</span>
+                    <span class="badge ${MODE_BADGE[g.send_mode] || 'badge-rr'}">${g.send_mode_name}</span>
+                    ${g.webhooks_fixed > 0 ? '<span class="badge badge-fixed">固定 ' + g.webhooks_fixed + '</span>' : ''}
+                </div>
+                <div class="group-stats-mini">
+                    <span>接收 ${g.received}</span>
+                    <span>成功 ${g.total_sent}</span>
+                    <span>失敗 ${g.total_failed}</span>
+                    <span>啟用 ${g.webhooks_enabled}/${g.webhooks_total}</span>
+                </div>
+            </div>
+            ${openGroups.has(g.group_id)
+                ? `<div class="group-body open" id="group-${g.group_id}">${renderGroupBody(g, today)}</div>`
+                : `<div class="group-body" id="group-${g.group_id}"></div>`}
+        </div>
+    `;
+}
+
+// 群組展開後的內容（端點、模式、Webhook 列表、記錄）
+function renderGroupBody(g, today) {
+    return `
+                <div class="section-title">接收端點</div>
+                <div class="endpoint-box">
+                    <span>${baseUrl}/webhook/${g.group_id}</span>
+                    <button class="copy-btn" data-action="copyEndpoint" data-group-id="${g.group_id}">複製</button>
+                </div>
+
+                <div class="section-title">發送模式</div>
+                <div class="mode-selector">
+                    <button class="mode-btn ${g.send_mode === 'sync' ? 'active' : ''}" data-action="setMode" data-group-id="${g.group_id}" data-mode="sync">同步模式</button>
+                    <button class="mode-btn ${g.send_mode === 'round_robin' ? 'active-rr' : ''}" data-action="setMode" data-group-id="${g.group_id}" data-mode="round_robin">輪詢模式</button>
+                </div>
+                <div class="mode-info ${g.send_mode}">
+                    ${g.send_mode === 'sync'
+                        ? '同步：同時發送到所有排程內的 Webhook'
+                        : '輪詢：輪流發送，跳過排程外的'}
+                </div>
+
+                <div class="section-title">Webhook 列表 (${g.webhooks_enabled}/${g.webhooks_total})</div>
+                <div class="add-form">
+                    <div class="title">添加新 Webhook</div>
+                    <div class="flex-row">
+                        <input type="text" id="wn-${g.group_id}" placeholder="名稱" style="max-width:110px">
+                        <select id="wt-${g.group_id}" style="max-width:95px">
+                            <option value="discord">Discord</option>
+                            <option value="feishu">飛書</option>
+                            <option value="wecom">企業微信</option>
+                        </select>
+                        <input type="text" id="wu-${g.group_id}" placeholder="Webhook URL">
+                        <label style="display:flex;align-items:center;gap:3px;font-size:0.82em;color:var(--text-secondary)">
+                            <input type="checkbox" id="wf-${g.group_id}"><span>固定</span>
+                        </label>
+                        <button class="btn btn-success btn-sm" data-action="addWebhook" data-group-id="${g.group_id}">添加</button>
+                    </div>
+                </div>
+
+                ${g.webhooks && g.webhooks.length ? g.webhooks.map((w, i) => {
+                    const isNext = w.id === g.next_webhook_id;
+                    const scheduleOff = w.schedule_mode !== 'off' && !w.is_in_schedule;
+                    return `
+                    <div class="webhook-item ${!w.enabled ? 'disabled' : ''} ${isNext ? 'next' : ''} ${w.is_fixed ? 'fixed' : ''} ${scheduleOff ? 'schedule-off' : ''}">
+                        <div class="webhook-header">
+                            <div class="webhook-name">
+                                ${TYPE_BADGE[w.webhook_type] || TYPE_BADGE.wecom}
+                                <span>${w.name_html}</span>
+                                ${w.is_fixed ? '<span class="badge badge-fixed">固定</span>' : ''}
+                                ${isNext ? '<span class="badge badge-next">下一個</span>' : ''}
+                                ${w.schedule_mode !== 'off' ? (w.is_in_schedule
+                                    ? '<span class="badge badge-schedule-on">排程中</span>'
+                                    : '<span class="badge badge-schedule">排程外</span>') : ''}
+                            </div>
+                            <div class="webhook-controls">
+                                <label class="toggle-switch">
+                                    <input type="checkbox" ${w.enabled ? 'checked' : ''} data-action="toggleWebhook" data-group-id="${g.group_id}" data-webhook-id="${w.id}">
+                                    <span class="toggle-slider"></span>
+                                </label>
+                                <button class="btn ${w.is_fixed ? 'btn-purple' : 'btn-outline'} btn-sm" data-action="toggleFixed" data-group-id="${g.group_id}" data-webhook-id="${w.id}" data-fixed="${!w.is_fixed}">固定</button>
+                                <button class="btn btn-warning btn-sm" data-action="toggleSchedulePanel" data-webhook-id="${w.id}">排程</button>
+                                <button class="btn btn-outline btn-sm" data-action="renameWebhook" data-group-id="${g.group_id}" data-webhook-id="${w.id}">改名</button>
+                                <button class="btn btn-outline btn-sm" data-action="testWebhook" data-group-id="${g.group_id}" data-webhook-id="${w.id}">測試</button>
+                                <button class="btn btn-danger btn-sm" data-action="removeWebhook" data-group-id="${g.group_id}" data-webhook-id="${w.id}">刪除</button>
+                            </div>
+                        </div>
+                        <div class="webhook-url">${w.url_preview_html}</div>
+                        <div class="webhook-stats">成功 ${w.sent} | 失敗 ${w.failed}${w.schedule_info_html ? ' | ' + w.schedule_info_html : ''}</div>
+
+                        <!-- v4.5 排程面板 -->
+                        <div class="schedule-panel ${w.schedule_mode !== 'off' ? 'active' : ''}" id="sp-${w.id}" style="display:none">
+                            <div style="display:flex;align-items:center;gap:8px;margin-bottom:8px;flex-wrap:wrap">
+                                <label class="toggle-switch">
+                                    <input type="checkbox" id="sm-${w.id}" ${w.schedule_mode !== 'off' ? 'checked' : ''} data-action="toggleScheduleMode" data-group-id="${g.group_id}" data-webhook-id="${w.id}">
+                                    <span class="toggle-slider"></span>
+                                </label>
+                                <span>啟用日期排程</span>
+                                ${w.schedules && w.schedules.length ? '<span style="color:var(--text-muted);font-size:0.9em">(' + w.schedules.length + ' 筆)</span>' : ''}
+                            </div>
+                            <div id="sl-${w.id}">
+                                ${(w.schedules || []).map((s, si) => {
+                                    const isExpired = s.date < today;
+                                    const isToday = s.date === today;
+                                    return '<div class="schedule-row ' + (isExpired ? 'expired' : '') + (isToday ? ' today' : '') + '">' +
+                                        '<span class="date">' + formatDateShort(s.date) + '</span>' +
+                                        '<span class="time">' + s.start_time + ' - ' + s.end_time + '</span>' +
+                                        (isToday && w.is_in_schedule ? '<span class="badge badge-schedule-on" style="font-size:0.7em">生效中</span>' : '') +
+                                        (isExpired ? '<span style="font-size:0.7em;color:var(--text-muted)">已過期</span>' : '') +
+                                        '<button class="btn btn-danger btn-sm" data-action="removeScheduleItem" data-group-id="' + g.group_id + '" data-webhook-id="' + w.id + '" data-index="' + si + '">刪除</button>' +
+                                        '</div>';
+                                }).join('')}
+                            </div>
+                            <div class="schedule-add-row">
+                                <input type="date" id="sd-${w.id}" value="${today}" style="max-width:130px;padding:3px">
+                                <input type="time" id="ss-${w.id}" value="00:00" style="max-width:90px;padding:3px">
+                                <span style="color:var(--text-muted)">-</span>
+                                <input type="time" id="se-${w.id}" value="23:59" style="max-width:90px;padding:3px">
+                                <button class="btn btn-success btn-sm" data-action="addScheduleItem" data-group-id="${g.group_id}" data-webhook-id="${w.id}">添加</button>
+                            </div>
+                            <div style="margin-top:8px;display:flex;gap:6px;flex-wrap:wrap">
+                                <button class="btn btn-outline btn-sm" data-action="clearExpiredSchedules" data-group-id="${g.group_id}" data-webhook-id="${w.id}">清除過期</button>
+                            </div>
+                        </div>
+                    </div>`;
+                }).join('') : '<div class="no-data">尚未添加任何 Webhook</div>'}
+
+                <div class="section-title">最近記錄</div>
+                ${g.history && g.history.length ? g.history.slice(0, 8).map(h => `
+                    <div class="history-item">
+                        <div style="display:flex;justify-content:space-between;flex-wrap:wrap;gap:4px">
+                            <span>
+                                <span class="time">${h.time}</span>
+                                <span class="mode-tag">${h.mode}</span>
+                                ${h.has_image ? '<span class="badge badge-img">圖</span>' : ''}
+                            </span>
+                            <span style="color:var(--text-secondary)">${h.status}</span>
+                        </div>
+                        <div style="color:var(--text-muted);margin-top:2px">${h.content}</div>
+                    </div>
+                `).join('') : '<div class="no-data">暫無記錄</div>'}
+
+                <div style="margin-top:12px;display:flex;gap:6px;justify-content:flex-end;flex-wrap:wrap">
+                    <button class="btn btn-outline btn-sm" data-action="testGroup" data-group-id="${g.group_id}">測試群組</button>
+                    <button class="btn btn-danger btn-sm" data-action="deleteGroup" data-group-id="${g.group_id}">刪除群組</button>
+                </div>
+    `;
+}
+
+// ====== 排程操作 ======
+
+async function getWebhookData(groupId, webhookId) {
+    const res = await (await fetch('/api/stats')).json();
+    for (const g of res.groups) {
+        if (g.group_id === groupId) {
+            for (const w of g.webhooks) {
+                if (w.id === webhookId) return w;
+            }
+        }
+    }
+    return null;
+}
+
+async function toggleScheduleMode(groupId, webhookId, enabled) {
+    const w = await getWebhookData(groupId, webhookId);
+    if (!w) return;
+    const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ schedule_mode: enabled ? 'date_range' : 'off', schedules: w.schedules || [] })
+    })).json();
+    if (res.success) { showSave(); scheduleReload(true); }
+    else showToast(res.message, true);
+}
+
+async function addScheduleItem(groupId, webhookId) {
+    const dateVal = document.getElementById('sd-' + webhookId).value;
+    const startVal = document.getElementById('ss-' + webhookId).value;
+    const endVal = document.getElementById('se-' + webhookId).value;
+    if (!dateVal || !startVal || !endVal) return showToast('請填寫完整', true);
+
+    const w = await getWebhookData(groupId, webhookId);
+    if (!w) return;
+
+    let schs = [...(w.schedules || [])];
+    if (schs.some(s => s.date === dateVal && s.start_time === startVal && s.end_time === endVal)) return showToast('此排程已存在', true);
+    schs.push({ date: dateVal, start_time: startVal, end_time: endVal });
+    schs.sort((a, b) => (a.date + a.start_time).localeCompare(b.date + b.start_time));
+
+    const modeChecked = document.getElementById('sm-' + webhookId).checked;
+    const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ schedule_mode: modeChecked ? 'date_range' : 'off', schedules: schs })
+    })).json();
+    if (res.success) { showSave(); scheduleReload(true); } else showToast(res.message, true);
+}
+
+async function removeScheduleItem(groupId, webhookId, index) {
+    const w = await getWebhookData(groupId, webhookId);
+    if (!w) return;
+    let schs = [...(w.schedules || [])];
+    schs.splice(index, 1);
+    await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ schedule_mode: w.schedule_mode, schedules: schs })
+    });
+    showSave(); scheduleReload(true);
+}
+
+async function clearExpiredSchedules(groupId, webhookId) {
+    const w = await getWebhookData(groupId, webhookId);
+    if (!w) return;
+    const today = getTodayStr();
+    let schs = [...(w.schedules || [])];
+    const filtered = schs.filter(s => s.date >= today);
+    if (filtered.length === schs.length) return showToast('沒有過期排程');
+    await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ schedule_mode: w.schedule_mode, schedules: filtered })
+    });
+    showToast('已清除 ' + (schs.length - filtered.length) + ' 筆過期排程');
+    scheduleReload(true);
+}
+
+// ====== CRUD 操作 ======
+
+async function createGroup() {
+    const id = document.getElementById('newGroupId').value.trim();
+    const name = document.getElementById('newGroupName').value.trim();
+    if (!id) return showToast('請輸入群組 ID', true);
+    const res = await (await fetch('/api/group', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ group_id: id, display_name: name || null })
+    })).json();
+    if (res.success) {
+        document.getElementById('newGroupId').value = '';
+        document.getElementById('newGroupName').value = '';
+        openGroups.add(id.toLowerCase());
+        showSave(); scheduleReload(true);
+    } else showToast(res.message, true);
+}
+
+async function deleteGroup(groupId) {
+    if (!confirm('確定刪除群組 [' + groupId + ']？')) return;
+    await fetch('/api/group/' + groupId, { method: 'DELETE' });
+    openGroups.delete(groupId);
+    showSave(); scheduleReload(true);
+}
+
+async function setMode(groupId, mode) {
+    const res = await (await fetch('/api/group/' + groupId + '/mode', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ mode })
+    })).json();
+    if (res.success) { showSave(); scheduleReload(true); } else showToast(res.message, true);
+}
+
+async function addWebhook(groupId) {
+    const name = document.getElementById('wn-' + groupId).value.trim();
+    const type = document.getElementById('wt-' + groupId).value;
+    const url = document.getElementById('wu-' + groupId).value.trim();
+    const fixed = document.getElementById('wf-' + groupId).checked;
+    if (!url) return showToast('請輸入 Webhook URL', true);
+    const res = await (await fetch('/api/group/' + groupId + '/webhook', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ url, name: name || null, webhook_type: type, is_fixed: fixed })
+    })).json();
+    if (res.success) {
+        document.getElementById('wn-' + groupId).value = '';
+        document.getElementById('wu-' + groupId).value = '';
+        document.getElementById('wt-' + groupId).value = 'discord';
+        document.getElementById('wf-' + groupId).checked = false;
+        showSave(); scheduleReload(true);
+    } else showToast(res.message, true);
+}
+
+// Webhook 操作先排入佇列，停頓 50ms 後以一次 /api/batch 請求送出
+let batchOps = [];
+let batchTimer = null;
+function pushBatchOp(op) {
+    batchOps.push(op);
+    clearTimeout(batchTimer);
+    batchTimer = setTimeout(flushBatchOps, 50);
+}
+
+async function flushBatchOps() {
+    clearTimeout(batchTimer);
+    batchTimer = null;
+    if (!batchOps.length) return;
+    const ops = batchOps;
+    batchOps = [];
+    try {
+        const res = await (await fetch('/api/batch', {
+            method: 'POST', headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(ops)
+        })).json();
+        // 逐筆結果中失敗的操作合併成一則錯誤提示
+        const failed = (res.results || []).filter(r => !r.success).map(r => r.message);
+        if (res.success) showSave();
+        else showToast(failed.length ? failed.join('；') : (res.message || '保存失敗'), true);
+    } catch (e) {
+        console.error(e);
+        showToast('保存失敗，請檢查連線', true);
+    }
+    scheduleReload(true);
+}
+
+// 關閉頁面時仍有未送出的操作則以 sendBeacon 補送
+window.addEventListener('pagehide', () => {
+    if (!batchOps.length) return;
+    navigator.sendBeacon('/api/batch', new Blob([JSON.stringify(batchOps)], { type: 'application/json' }));
+    batchOps = [];
+});
+
+function removeWebhook(groupId, webhookId) {
+    if (!confirm('確定移除？')) return;
+    openSchedulePanels.delete(webhookId);
+    pushBatchOp({ op: 'remove', group_id: groupId, webhook_id: webhookId });
+}
+
+function toggleWebhook(groupId, webhookId, enabled) {
+    pushBatchOp({ op: 'toggle', group_id: groupId, webhook_id: webhookId, enabled });
+}
+
+function toggleFixed(groupId, webhookId, isFixed) {
+    pushBatchOp({ op: 'fixed', group_id: groupId, webhook_id: webhookId, is_fixed: isFixed });
+}
+
+function renameWebhook(groupId, webhookId, currentName) {
+    const newName = prompt('請輸入新名稱:', currentName);
+    if (!newName || newName === currentName) return;
+    pushBatchOp({ op: 'rename', group_id: groupId, webhook_id: webhookId, name: newName });
+}
+
+async function testWebhook(groupId, webhookId) {
+    const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/test', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ content: '[測試] ' + new Date().toLocaleTimeString() })
+    })).json();
+    showToast(res.success ? '測試成功' : res.message, !res.success);
+    scheduleReload(true);
+}
+
+async function testGroup(groupId) {
+    const content = prompt('測試訊息:', '[測試] ' + groupId.toUpperCase());
+    if (!content) return;
+    // sync=1：等待實際發送結果，提示才反映各端點是否成功（預設只會回傳已入列）
+    const res = await (await fetch('/webhook/' + groupId + '?sync=1', {
+        method: 'POST', headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({ content })
+    })).json();
+    // 列出發送失敗的端點（排程外與斷路器暫停中不算失敗）
+    const failed = (res.details || []).filter(d => !d.success && !d.skipped && !d.circuit_open).map(d => d.name);
+    showToast(failed.length ? res.message + '（失敗: ' + failed.join('、') + '）' : res.message, !res.success);
+    scheduleReload(true);
+}
+
+// ====== 初始化 ======
+bindGroupListActions();
+document.getElementById('feishuSaveBtn').addEventListener('click', updateFeishuCredentials);
+document.getElementById('feishuShowBtn').addEventListener('click', () => {
+    const secret = document.getElementById('feishuAppSecret');
+    secret.type = secret.type === 'password' ? 'text' : 'password';
+});
+document.getElementById('createGroupBtn').addEventListener('click', createGroup);
+document.getElementById('newGroupId').addEventListener('keypress', e => { if (e.key === 'Enter') createGroup(); });
+document.getElementById('newGroupName').addEventListener('keypress', e => { if (e.key === 'Enter') createGroup(); });
+
+loadData();
+
+// 伺服器推送狀態變更時才重新載入；不支援推送或連線中斷時退回每 5 秒輪詢
+// 上一次載入完成後才排下一次，伺服器變慢時不會疊加請求
+let polling = false;
+let pollTimer = null;
+function schedulePoll() {
+    pollTimer = setTimeout(async () => {
+        pollTimer = null;
+        await loadData();
+        if (polling && !pollTimer) schedulePoll();
+    }, 5000);
+}
+function startPolling() {
+    if (polling) return;
+    polling = true;
+    schedulePoll();
+}
+function stopPolling() {
+    polling = false;
+    clearTimeout(pollTimer);
+    pollTimer = null;
+}
+if (window.EventSource) {
+    const events = new EventSource('/api/events');
+    events.onopen = stopPolling;
+    events.onmessage = e => onStateEvent(e.data);
+    events.onerror = startPolling;
+} else {
+    startPolling();
+}
@@ -43,15 +43,32 @@ import os
 import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.filepost import encode_multipart_formdata
 import hashlib
+import hmac
+import secrets
 import base64
-from datetime import datetime
-from flask import Flask, request, jsonify, render_template_string, Response
-from functools import wraps
-from collections import deque
+import gzip
+from urllib.parse import urlparse
+from datetime import date, datetime, timedelta, timezone
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
+from functools import wraps, lru_cache
+from collections import deque, OrderedDict
+from itertools import islice
+from markupsafe import escape
 import logging
 import re
 import atexit
+import queue
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import orjson
+except ImportError:  # 未安裝 orjson 時退回標準庫 json
+    orjson = None
 
 # ================================================================================
 # 環境變數配置
@@ -71,6 +88,43 @@ CONFIG_FILE = os.environ.get('CONFIG_FILE', 'webhook_config.json')
 # 時區設定（預設台灣 UTC+8）
 TIMEZONE_OFFSET = int(os.environ.get('TIMEZONE_OFFSET', 8))
 
+# 單張圖片大小上限（MB，超過時拒絕，避免過大附件佔用記憶體）
+MAX_IMAGE_BYTES = int(os.environ.get('MAX_IMAGE_MB', 20)) * 1024 * 1024
+
+# 重複訊息過濾秒數（同一群組在此秒數內收到相同內容與圖片時略過，0 為停用）
+DEDUPE_SECONDS = float(os.environ.get('DEDUPE_SECONDS', 2))
+
+# 中繼佇列容量與背景發送執行緒數（佇列滿時 /webhook 回傳 503）
+RELAY_QUEUE_SIZE = int(os.environ.get('RELAY_QUEUE_SIZE', 10000))
+RELAY_WORKERS = int(os.environ.get('RELAY_WORKERS', 8))
+
+# 對外發送執行緒數（同時進行中的 Webhook POST 上限，連線池大小隨之調整）
+SEND_WORKERS = int(os.environ.get('SEND_WORKERS', 32))
+
+# 遠端附件圖片下載執行緒數與單張下載總時限（秒；下載在獨立執行緒池進行，慢速 CDN 不會佔住中繼執行緒）
+IMAGE_DOWNLOADS = int(os.environ.get('IMAGE_DOWNLOADS', 4))
+IMAGE_DOWNLOAD_SECONDS = float(os.environ.get('IMAGE_DOWNLOAD_SECONDS', 30))
+
+# 純文字訊息合併視窗（毫秒，視窗內同群組的文字訊息合併成一則發送，0 為停用）
+WEBHOOK_BATCH_WINDOW_MS = float(os.environ.get('WEBHOOK_BATCH_WINDOW_MS', 0))
+WEBHOOK_BATCH_MAX = int(os.environ.get('WEBHOOK_BATCH_MAX', 10))
+
+# 一則訊息等待所有 Webhook 發送完成的上限（秒），逾時的端點記為失敗，避免中繼執行緒被卡住
+SEND_WAIT_SECONDS = float(os.environ.get('SEND_WAIT_SECONDS', 60))
+
+# 每個群組每秒最多接收幾則訊息（令牌桶，超過時 /webhook 回傳 429，0 為不限制）
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', 100))
+
+# /webhook 自動建立未知群組的限制：群組總數上限與每分鐘建立次數（超過時回傳 429，0 為不限制）
+MAX_AUTO_GROUPS = int(os.environ.get('MAX_AUTO_GROUPS', 50))
+AUTO_GROUPS_PER_MINUTE = float(os.environ.get('AUTO_GROUPS_PER_MINUTE', 10))
+
+# 發送統計與輪詢位置的定期保存間隔（秒，只在狀態有變更時寫入，0 為停用）
+STATS_SAVE_SECONDS = float(os.environ.get('STATS_SAVE_SECONDS', 30))
+
+# 除錯模式（啟用時管理介面不做壓縮，方便開發檢視原始碼）
+DEBUG = os.environ.get('DEBUG', '').lower() in ('1', 'true', 'yes')
+
 # ================================================================================
 # 日誌設定
 # ================================================================================
@@ -82,21 +136,219 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 格式中沒有用到執行緒 / 進程資訊，關掉後每筆日誌少幾次系統呼叫
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# ================================================================================
+# HTTP 連線池（所有對外請求共用，重複發送到同一主機時沿用 keep-alive 連線）
+# ================================================================================
+
+def _create_http_session() -> requests.Session:
+    """
+    建立共用的 requests.Session
+    
+    - 連線池：每個主機最多保留 max(64, SEND_WORKERS) 條連線，發送執行緒不會因連線池滿而丟棄連線
+    - 重試：只重試連線失敗，以及 GET 遇到 429 / 5xx
+      （預設 allowed_methods 不含 POST，避免 Webhook 重複發送）
+    """
+    session = requests.Session()
+    retry = Retry(total=2, backoff_factor=0.1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=max(64, SEND_WORKERS), max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+http_session = _create_http_session()
+
+# 連線逾時（秒）：無法連線的主機快速失敗，讀取逾時沿用各請求原本的設定
+HTTP_CONNECT_TIMEOUT = 3.05
+
+# 發送執行緒池（同一則訊息的多個 Webhook 並行發送，總耗時取決於最慢的一個）
+send_executor = ThreadPoolExecutor(max_workers=max(1, SEND_WORKERS), thread_name_prefix='send')
+
+# 中繼佇列（/webhook 只負責入列，遠端圖片下載、過濾、圖片上傳與發送都在背景執行緒完成）
+# 項目為 (群組, 內容, 圖片, 來源 IP, 合併前的各則訊息或 None, 待下載的圖片網址或 None)
+relay_queue = queue.Queue(maxsize=RELAY_QUEUE_SIZE)
+
+# 附件下載執行緒池：中繼執行緒只提交下載，完成後再重新入列；
+# 等待下載的項目同樣以 RELAY_QUEUE_SIZE 為上限，超過時與佇列已滿一樣拒絕
+download_executor = ThreadPoolExecutor(max_workers=max(1, IMAGE_DOWNLOADS), thread_name_prefix='download')
+_download_backlog = threading.BoundedSemaphore(max(1, RELAY_QUEUE_SIZE))
+
+
+def _download_and_enqueue(group, content: str, source_ip: str, image_url: str):
+    """下載遠端附件後重新放入中繼佇列（在下載執行緒池執行）"""
+    try:
+        image_data = download_image(image_url)
+        if image_data is None:
+            logger.warning("[%s] 附件讀取失敗或超過 %dMB: %s", group.group_id,
+                           MAX_IMAGE_BYTES // 1024 // 1024, image_url[:80])
+            if not content:
+                group.record_download_failed(source_ip)
+                return
+        group.enqueue_message(content, image_data, source_ip)
+    except Exception as e:
+        logger.error("[%s] 附件下載失敗: %s", group.group_id, e)
+    finally:
+        _download_backlog.release()
+
+
+def _relay_worker():
+    """背景中繼執行緒：依序取出佇列項目並執行中繼（待下載附件的項目轉交下載執行緒池）"""
+    while True:
+        group, content, image_data, source_ip, parts, image_url = relay_queue.get()
+        try:
+            if image_url:
+                if _download_backlog.acquire(blocking=False):
+                    download_executor.submit(_download_and_enqueue, group, content, source_ip, image_url)
+                else:
+                    group.record_dropped("等待下載的附件過多，拒絕訊息")
+                continue
+            group.relay_message(content, image_data, source_ip, parts)
+        except Exception as e:
+            logger.error("[%s] 背景中繼失敗: %s", group.group_id, e)
+        finally:
+            relay_queue.task_done()
+
+
+for _i in range(RELAY_WORKERS):
+    threading.Thread(target=_relay_worker, name=f'relay-worker-{_i}', daemon=True).start()
+
 # ================================================================================
 # 時區輔助函數
 # ================================================================================
 
+LOCAL_TZ = timezone(timedelta(hours=TIMEZONE_OFFSET))  # 時差固定，只建立一次
+
+
 def get_local_time() -> datetime:
     """獲取本地時間（根據 TIMEZONE_OFFSET 設定）"""
-    from datetime import timezone, timedelta
-    utc_now = datetime.now(timezone.utc)
-    local_tz = timezone(timedelta(hours=TIMEZONE_OFFSET))
-    return utc_now.astimezone(local_tz)
+    return datetime.now(LOCAL_TZ)
 
 
-def get_local_time_str(fmt: str = "%Y-%m-%d %H:%M:%S") -> str:
-    """獲取格式化的本地時間字串"""
-    return get_local_time().strftime(fmt)
+def _hhmm_to_minutes(text: str) -> int:
+    """將 "HH:MM" 轉為當日分鐘數"""
+    hour, _, minute = text.partition(':')
+    return int(hour) * 60 + int(minute)
+
+
+DEFAULT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+_time_str_cache = (0, "")  # (epoch 秒數, 預設格式字串)：同一秒內重複使用
+
+
+def get_local_time_str(fmt: str = DEFAULT_TIME_FORMAT) -> str:
+    """獲取格式化的本地時間字串（預設格式每秒只格式化一次）"""
+    global _time_str_cache
+    if fmt != DEFAULT_TIME_FORMAT:
+        return get_local_time().strftime(fmt)
+    
+    second = int(time.time())
+    cached_second, cached_str = _time_str_cache
+    if cached_second == second:
+        return cached_str
+    
+    text = datetime.fromtimestamp(second, LOCAL_TZ).strftime(DEFAULT_TIME_FORMAT)
+    _time_str_cache = (second, text)  # 整個 tuple 一次替換，多執行緒下不會讀到一半
+    return text
+
+
+# ================================================================================
+# JSON 編碼輔助函數
+# ================================================================================
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+
+def json_dumps_bytes(obj) -> bytes:
+    """序列化為 UTF-8 JSON bytes（優先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_dumps_pretty(obj) -> bytes:
+    """序列化為縮排 2 格的 UTF-8 JSON bytes（配置文件用，優先使用 orjson）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def json_loads(data):
+    """解析 JSON（接受 bytes 或 str，優先使用 orjson）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_response(body, status: int = 200) -> Response:
+    """回傳 JSON 回應（body 可為已序列化的 bytes）"""
+    if not isinstance(body, bytes):
+        body = json_dumps_bytes(body)
+    return Response(body, status=status, mimetype='application/json')
+
+
+# 常用錯誤回應（預先序列化，回傳時只需建立新的 Response）
+ERR_NO_GROUP = json_dumps_bytes({"success": False, "message": "群組不存在"})
+ERR_NO_WEBHOOK = json_dumps_bytes({"success": False, "message": "找不到此 Webhook"})
+ERR_NO_CONTENT = json_dumps_bytes({"success": False, "message": "無內容"})
+ERR_BAD_PAYLOAD = json_dumps_bytes({"success": False, "message": "content 必須是字串，attachments 必須是陣列"})
+ERR_IMAGE_TOO_LARGE = json_dumps_bytes({"success": False, "message": "圖片過大"})
+ERR_NO_GROUP_ID = json_dumps_bytes({"success": False, "message": "請提供群組 ID"})
+ERR_GROUP_EXISTS = json_dumps_bytes({"success": False, "message": "此群組 ID 已存在"})
+ERR_QUEUE_FULL = json_dumps_bytes({"success": False, "message": "中繼佇列已滿，請稍後重試"})
+ERR_RATE_LIMITED = json_dumps_bytes({"success": False, "message": "訊息過於頻繁，請稍後重試"})
+ERR_GROUP_LIMIT = json_dumps_bytes({"success": False, "message": "無法自動建立更多群組，請先在管理介面建立"})
+ERR_TOO_MANY_STREAMS = json_dumps_bytes({"success": False, "message": "推送連線過多"})
+ERR_BAD_BATCH = json_dumps_bytes({"success": False, "message": "批次操作格式錯誤"})
+ERR_BAD_SCHEDULES = json_dumps_bytes({"success": False, "message": "排程列表格式錯誤"})
+ERR_BAD_SCHEDULE_MODE = json_dumps_bytes({"success": False, "message": "無效的排程模式"})
+
+
+def image_digest(image_data: bytes) -> str:
+    """圖片識別雜湊（BLAKE2b，比 MD5 快；同一則訊息只計算一次，供去重與飛書上傳快取共用）"""
+    return hashlib.blake2b(image_data, digest_size=16).hexdigest()
+
+
+# 圖片格式魔術位元組 -> (副檔名, MIME)
+IMAGE_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', ('png', 'image/png')),
+    (b'\xff\xd8\xff', ('jpg', 'image/jpeg')),
+    (b'GIF87a', ('gif', 'image/gif')),
+    (b'GIF89a', ('gif', 'image/gif')),
+)
+
+
+def sniff_image_type(image_data: bytes) -> tuple:
+    """依檔頭判斷圖片格式，回傳 (副檔名, MIME)，無法辨識時回傳 None"""
+    for magic, kind in IMAGE_MAGIC:
+        if image_data.startswith(magic):
+            return kind
+    if image_data[:4] == b'RIFF' and image_data[8:12] == b'WEBP':
+        return ('webp', 'image/webp')
+    return None
+
+
+@lru_cache(maxsize=4096)
+def escape_html(text: str) -> str:
+    """HTML 跳脫（名稱等文字很少變動，結果快取後每次輪詢直接重用）"""
+    return str(escape(text))
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """讓 jsonify / request.get_json 改用 orjson 序列化與解析"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=self.default).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default), mimetype=self.mimetype)
 
 
 # ================================================================================
@@ -298,6 +550,8 @@ PRESET_WEBHOOKS = {
 # ================================================================================
 
 app = Flask(__name__)
+if orjson is not None:
+    app.json = OrjsonProvider(app)
 
 
 # ================================================================================
@@ -307,46 +561,131 @@ app = Flask(__name__)
 class FeishuImageUploader:
     """飛書圖片上傳器 - 支援 token 快取與圖片快取"""
     
+    UPLOAD_CACHE_SIZE = 512  # 圖片快取上限（超過時淘汰最久未使用的）
+    TOKEN_MIN_REMAINING = 60     # token 剩餘秒數低於此值視為失效，需同步取得新 token
+    TOKEN_REFRESH_AHEAD = 300    # 剩餘秒數低於此值時改由背景更新，期間照常回傳舊 token
+    MAX_UPLOAD_BYTES = 10 * 1024 * 1024  # 飛書圖片上傳大小上限
+    
     def __init__(self):
-        self.upload_cache = {}
+        self.upload_cache = OrderedDict()  # 圖片雜湊 -> image_key（LRU）
+        self.uploading = {}                # 圖片雜湊 -> Event（上傳中，相同圖片等待同一次上傳）
+        self.cache_lock = threading.Lock()
         self.token_cache = {'token': None, 'expire_time': 0}
+        self.token_lock = threading.Lock()
         self.app_id = None
         self.app_secret = None
+        self.generation = 0  # 憑證世代：每次更換憑證遞增，舊憑證的 token / image_key 不再寫入快取
     
     def set_credentials(self, app_id: str, app_secret: str):
-        """設定飛書憑證"""
-        self.app_id = app_id
-        self.app_secret = app_secret
+        """設定飛書憑證（應用變更時清除 token 與圖片快取，image_key 只在原應用內有效）"""
+        if (app_id, app_secret) == (self.app_id, self.app_secret):
+            return
+        with self.token_lock:
+            self.app_id = app_id
+            self.app_secret = app_secret
+            self.token_cache = {'token': None, 'expire_time': 0}
+            with self.cache_lock:
+                self.generation += 1
+                self.upload_cache.clear()
+    
+    def _credentials(self) -> tuple:
+        """目前生效的 (app_id, app_secret)（未設定時使用環境變數）"""
+        return self.app_id or FEISHU_APP_ID, self.app_secret or FEISHU_APP_SECRET
+    
+    def _get_cached_image_key(self, img_hash: str) -> str:
+        """查詢圖片快取，命中時移到最新位置"""
+        with self.cache_lock:
+            image_key = self.upload_cache.get(img_hash)
+            if image_key:
+                self.upload_cache.move_to_end(img_hash)
+            return image_key
+    
+    def _cache_image_key(self, img_hash: str, image_key: str, generation: int):
+        """寫入圖片快取，超過上限時淘汰最舊的項目（上傳期間憑證已更換時不寫入）"""
+        with self.cache_lock:
+            if generation != self.generation:
+                return
+            self.upload_cache[img_hash] = image_key
+            self.upload_cache.move_to_end(img_hash)
+            while len(self.upload_cache) > self.UPLOAD_CACHE_SIZE:
+                self.upload_cache.popitem(last=False)
+    
+    def _get_cached_token(self, min_remaining: float = TOKEN_MIN_REMAINING) -> str:
+        """回傳剩餘時間超過 min_remaining 秒的 token，否則回傳 None"""
+        cache = self.token_cache
+        if cache['token'] and time.time() < cache['expire_time'] - min_remaining:
+            return cache['token']
+        return None
+    
+    def _refresh_token_in_background(self):
+        """背景更新即將到期的 token（已有更新進行中時直接略過）"""
+        if not self.token_lock.acquire(blocking=False):
+            return
+        
+        def refresh():
+            try:
+                if not self._get_cached_token(self.TOKEN_REFRESH_AHEAD):
+                    self._fetch_tenant_access_token()
+            finally:
+                self.token_lock.release()
+        
+        threading.Thread(target=refresh, name='feishu-token-refresh', daemon=True).start()
     
     def get_tenant_access_token(self) -> str:
-        """獲取 tenant_access_token（帶緩存）"""
+        """
+        獲取 tenant_access_token（帶緩存）
+        
+        快取失效時只由一個執行緒向飛書取新 token，其他執行緒等待後直接沿用；
+        即將到期（剩餘不足 TOKEN_REFRESH_AHEAD 秒）時先回傳舊 token 並在背景更新，發送不必等待
+        """
+        app_id, app_secret = self._credentials()
+        if not app_id or not app_secret:
+            logger.warning("飛書憑證未設定")
+            return None
+        
+        token = self._get_cached_token(self.TOKEN_REFRESH_AHEAD)
+        if token:
+            return token
+        token = self._get_cached_token()
+        if token:
+            self._refresh_token_in_background()
+            return token
+        
+        with self.token_lock:
+            # 等待鎖期間其他執行緒可能已取得新 token
+            token = self._get_cached_token()
+            if token:
+                return token
+            return self._fetch_tenant_access_token()
+    
+    def _fetch_tenant_access_token(self) -> str:
+        """
+        向飛書請求新的 tenant_access_token 並寫入快取（呼叫前需持有 token_lock）
+        
+        憑證在鎖內讀取，等待鎖期間更換的憑證也會生效；請求期間憑證世代改變時不寫入快取
+        """
+        app_id, app_secret = self._credentials()
+        generation = self.generation
+        if not app_id or not app_secret:
+            return None
         try:
-            app_id = self.app_id or FEISHU_APP_ID
-            app_secret = self.app_secret or FEISHU_APP_SECRET
-            
-            if not app_id or not app_secret:
-                logger.warning("飛書憑證未設定")
-                return None
-            
             current_time = time.time()
-            if self.token_cache['token'] and current_time < self.token_cache['expire_time'] - 60:
-                return self.token_cache['token']
-            
             logger.info("開始獲取新的飛書 access_token...")
             url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
             payload = {"app_id": app_id, "app_secret": app_secret}
             
-            response = requests.post(url, json=payload, timeout=10)
+            response = http_session.post(url, data=json_dumps_bytes(payload), headers=JSON_HEADERS, timeout=(HTTP_CONNECT_TIMEOUT, 10))
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if result.get('code') == 0:
                     token = result.get('tenant_access_token')
                     expire = result.get('expire', 7200)
-                    self.token_cache = {
-                        'token': token,
-                        'expire_time': current_time + expire
-                    }
+                    if generation == self.generation:
+                        self.token_cache = {
+                            'token': token,
+                            'expire_time': current_time + expire
+                        }
                     logger.info("獲取飛書 access_token 成功")
                     return token
                 else:
@@ -359,18 +698,59 @@ class FeishuImageUploader:
             logger.error(f"獲取 access_token 異常: {e}")
             return None
     
-    def upload_image(self, image_data: bytes) -> str:
-        """上傳圖片到飛書，回傳 image_key"""
+    def upload_image(self, image_data: bytes, img_hash: str = None) -> str:
+        """
+        上傳圖片到飛書，回傳 image_key
+        
+        相同圖片同時上傳時只有第一個請求實際上傳，其餘等待並沿用結果
+        """
+        if not image_data:
+            return None
+        
+        # 先擋下飛書必定拒收的圖片，省去雜湊與上傳往返
+        if len(image_data) > self.MAX_UPLOAD_BYTES:
+            logger.warning("圖片 %d bytes 超過飛書上限，略過上傳", len(image_data))
+            return None
+        kind = sniff_image_type(image_data)
+        if kind is None:
+            logger.warning("無法辨識的圖片格式，略過飛書上傳")
+            return None
+        
+        # 以圖片雜湊快取避免重複上傳（呼叫端已算過時直接沿用）
+        if img_hash is None:
+            img_hash = image_digest(image_data)
+        cached_key = self._get_cached_image_key(img_hash)
+        if cached_key:
+            logger.info("使用緩存的飛書圖片 key")
+            return cached_key
+        
+        with self.cache_lock:
+            event = self.uploading.get(img_hash)
+            is_owner = event is None
+            if is_owner:
+                event = self.uploading[img_hash] = threading.Event()
+        
+        if not is_owner:
+            event.wait(timeout=45)
+            return self._get_cached_image_key(img_hash)
+        
         try:
-            if not image_data:
-                return None
-            
-            # 使用 MD5 快取避免重複上傳
-            img_hash = hashlib.md5(image_data).hexdigest()
-            if img_hash in self.upload_cache:
-                logger.info("使用緩存的飛書圖片 key")
-                return self.upload_cache[img_hash]
+            return self._upload(img_hash, image_data, kind)
+        finally:
+            with self.cache_lock:
+                self.uploading.pop(img_hash, None)
+            event.set()
+    
+    def _upload(self, img_hash: str, image_data: bytes, kind: tuple) -> str:
+        """實際上傳圖片，成功時寫入快取"""
+        try:
+            # 等待期間可能已由其他請求上傳完成
+            cached_key = self._get_cached_image_key(img_hash)
+            if cached_key:
+                return cached_key
             
+            # 先記下憑證世代再取 token，上傳期間更換憑證時結果不寫入快取
+            generation = self.generation
             token = self.get_tenant_access_token()
             if not token:
                 logger.error("無法獲取 access_token，圖片上傳失敗")
@@ -378,18 +758,19 @@ class FeishuImageUploader:
             
             url = "https://open.feishu.cn/open-apis/im/v1/images"
             headers = {"Authorization": f"Bearer {token}"}
-            files = {'image': ('screenshot.png', image_data, 'image/png')}
+            ext, mimetype = kind
+            files = {'image': (f'screenshot.{ext}', image_data, mimetype)}
             data = {'image_type': 'message'}
             
-            response = requests.post(url, headers=headers, files=files, data=data, timeout=30)
+            response = http_session.post(url, headers=headers, files=files, data=data, timeout=(HTTP_CONNECT_TIMEOUT, 30))
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 if result.get('code') == 0:
                     image_key = result.get('data', {}).get('image_key')
                     if image_key:
-                        self.upload_cache[img_hash] = image_key
-                        logger.info(f"飛書圖片上傳成功: {image_key}")
+                        self._cache_image_key(img_hash, image_key, generation)
+                        logger.info("飛書圖片上傳成功: %s", image_key)
                         return image_key
                 else:
                     logger.error(f"飛書圖片上傳 API 錯誤: {result.get('msg')}")
@@ -423,15 +804,20 @@ class WebhookItem:
         ]
     
     向後相容 v4.4：
-        舊版的 schedule_enabled / schedule_start / schedule_end
+        v4.4 的 schedule_enabled / schedule_start / schedule_end
         會自動轉換為一筆以今天日期為基礎的排程
     """
     
+    CIRCUIT_FAILURES = 5   # 連續失敗達此次數後暫停發送
+    CIRCUIT_SECONDS = 60   # 暫停秒數
+    
     def __init__(self, url: str, name: str = None, webhook_type: str = 'discord',
                  enabled: bool = True, is_fixed: bool = False, webhook_id: str = None,
                  schedule_mode: str = "off", schedules: list = None):
-        self.id = webhook_id or hashlib.md5(f"{url}{time.time()}".encode()).hexdigest()[:8]
+        self.id = webhook_id or secrets.token_hex(4)
         self.url = url
+        # URL 建立後不會再修改，預覽文字只在建構時計算並跳脫一次
+        self.url_preview_html = str(escape(f"...{url[-30:]}" if len(url) > 35 else url))
         self.name = name or self._generate_default_name(webhook_type)
         self.webhook_type = webhook_type
         self.enabled = enabled
@@ -439,22 +825,68 @@ class WebhookItem:
         self.stats = {"sent": 0, "failed": 0}
         self.created_at = get_local_time_str()
         
+        # 斷路器：連續失敗過多時暫停發送，避免每則訊息都卡在失效端點的逾時上
+        self.consecutive_failures = 0
+        self.circuit_open_until = 0.0  # time.monotonic()，到期前略過發送
+        
         # v4.5 多筆日期排程
         self.schedule_mode = schedule_mode  # "off" | "date_range"
         self.schedules = schedules or []    # [{date, start_time, end_time}, ...]
     
+    @property
+    def schedules(self) -> list:
+        return self._schedules
+    
+    @schedules.setter
+    def schedules(self, schedules: list):
+        """設定排程時一併建立 {日期: [(開始分鐘, 結束分鐘), ...]} 索引，判斷排程時不必再解析字串"""
+        self._schedules = schedules
+        index = {}
+        for schedule in schedules:
+            try:
+                day = date.fromisoformat(schedule.get("date", ""))
+                start = _hhmm_to_minutes(schedule.get("start_time", "00:00"))
+                end = _hhmm_to_minutes(schedule.get("end_time", "23:59"))
+            except (TypeError, ValueError):
+                continue  # 格式錯誤的項目永遠不會匹配
+            index.setdefault(day, []).append((start, end))
+        self._schedule_index = index
+    
     def _generate_default_name(self, webhook_type: str) -> str:
         """產生預設名稱"""
         timestamp = get_local_time_str("%H%M%S")
         type_map = {'discord': 'Discord', 'feishu': '飛書', 'wecom': '企業微信'}
         return f"{type_map.get(webhook_type, 'Webhook')}-{timestamp}"
     
-    def is_in_schedule(self) -> bool:
+    def is_circuit_open(self) -> bool:
+        """是否因連續失敗而暫停發送中"""
+        return time.monotonic() < self.circuit_open_until
+    
+    def record_result(self, success: bool) -> bool:
+        """
+        記錄發送結果，連續失敗 CIRCUIT_FAILURES 次時暫停 CIRCUIT_SECONDS 秒
+        
+        Returns:
+            bool: 是否因這次失敗而開始暫停
+        """
+        if success:
+            self.consecutive_failures = 0
+            self.circuit_open_until = 0.0
+            return False
+        self.consecutive_failures += 1
+        if self.consecutive_failures < self.CIRCUIT_FAILURES:
+            return False
+        self.consecutive_failures = 0
+        self.circuit_open_until = time.monotonic() + self.CIRCUIT_SECONDS
+        return True
+    
+    def is_in_schedule(self, now: datetime = None) -> bool:
         """
         檢查當前時間是否在排程內
         
         - schedule_mode == "off": 永遠回傳 True（不限制）
         - schedule_mode == "date_range": 檢查今天是否有匹配的排程項，且當前時間在該時段內
+        - now: 可由呼叫端傳入同一個時間點，批次檢查時避免重複取時間
         """
         if self.schedule_mode == "off":
             return True
@@ -462,29 +894,21 @@ class WebhookItem:
         if not self.schedules:
             return False
         
-        now = get_local_time()
-        today_str = now.strftime("%Y-%m-%d")
-        current_time = now.strftime("%H:%M")
+        now = now or get_local_time()
+        current = now.hour * 60 + now.minute
         
-        for schedule in self.schedules:
-            # 只檢查今天的排程
-            if schedule.get("date") != today_str:
-                continue
-            
-            start_time = schedule.get("start_time", "00:00")
-            end_time = schedule.get("end_time", "23:59")
-            
+        # 只檢查今天的排程
+        for start, end in self._schedule_index.get(now.date(), ()):
             # 處理跨日情況（例如 22:00 - 02:00）
-            if start_time <= end_time:
-                if start_time <= current_time <= end_time:
-                    return True
-            else:
-                if current_time >= start_time or current_time <= end_time:
+            if start <= end:
+                if start <= current <= end:
                     return True
+            elif current >= start or current <= end:
+                return True
         
         return False
     
-    def get_schedule_info(self) -> str:
+    def get_schedule_info(self, now: datetime = None) -> str:
         """
         取得排程摘要資訊（用於 UI 顯示）
         
@@ -500,7 +924,7 @@ class WebhookItem:
         if not self.schedules:
             return "排程: 無排程項"
         
-        today_str = get_local_time().strftime("%Y-%m-%d")
+        today_str = (now or get_local_time()).strftime("%Y-%m-%d")
         
         # 篩選未過期的排程（今天及以後），按日期+時間排序
         upcoming = sorted(
@@ -526,19 +950,22 @@ class WebhookItem:
         
         return result
     
-    def to_dict(self) -> dict:
+    def to_dict(self, now: datetime = None) -> dict:
         """轉換為字典（用於 API 回應 / UI 顯示）"""
+        now = now or get_local_time()
         return {
             "id": self.id,
             "name": self.name,
-            "url_preview": f"...{self.url[-30:]}" if len(self.url) > 35 else self.url,
+            "name_html": escape_html(self.name),
+            "url_preview_html": self.url_preview_html,
             "webhook_type": self.webhook_type,
             "enabled": self.enabled,
             "is_fixed": self.is_fixed,
             "schedule_mode": self.schedule_mode,
             "schedules": self.schedules,
-            "schedule_info": self.get_schedule_info(),
-            "is_in_schedule": self.is_in_schedule(),
+            "schedule_info_html": escape_html(self.get_schedule_info(now)),
+            "is_in_schedule": self.is_in_schedule(now),
+            "circuit_open": self.is_circuit_open(),
             "sent": self.stats["sent"],
             "failed": self.stats["failed"],
             "created_at": self.created_at
@@ -601,19 +1028,111 @@ class WebhookItem:
 # ================================================================================
 
 class MessageSender:
-    """消息發送器 - 支援 Discord、飛書、企業微信"""
+    """
+    消息發送器 - 支援 Discord、飛書、企業微信
+    
+    build_* 產生已序列化的 JSON body；send_to_* 可傳入預先建好的 body，
+    同一則訊息發送到多個同類型 Webhook 時只需建構與序列化一次
+    """
+    
+    # ---- payload 建構 ----
+    
+    @staticmethod
+    def build_discord_body(content: str) -> bytes:
+        """Discord 純文字 payload"""
+        return json_dumps_bytes({"content": content})
+    
+    @staticmethod
+    def build_discord_batch_body(content: str, parts: list) -> bytes:
+        """
+        Discord 合併訊息 payload：每則原始訊息一個 embed
+        
+        超過 Discord 限制（10 個 embed、單個 4096 字、總計 6000 字）時
+        退回以 content 發送合併後的純文字
+        """
+        if (len(parts) > 10 or max(map(len, parts)) > 4096
+                or sum(map(len, parts)) > 6000):
+            return MessageSender.build_discord_body(content)
+        return json_dumps_bytes({"embeds": [{"description": part} for part in parts]})
     
     @staticmethod
-    def send_to_discord(webhook_url: str, content: str, image_data: bytes = None) -> bool:
+    def build_discord_multipart(content: str, image_data: bytes) -> tuple:
+        """Discord 文字 + 圖片的 multipart payload，回傳 (body, Content-Type)"""
+        ext, mimetype = sniff_image_type(image_data) or ('png', 'image/png')
+        return encode_multipart_formdata([
+            ('content', content),
+            ('file', (f'screenshot.{ext}', image_data, mimetype))
+        ])
+    
+    @staticmethod
+    def build_feishu_body(content: str, image_key: str = None) -> bytes:
+        """飛書富文本 payload"""
+        # 文字內容（splitlines 同時處理 \r\n，略過空白行）
+        content_blocks = [
+            [{"tag": "text", "text": line + "\n"}]
+            for line in content.splitlines() if line and not line.isspace()
+        ] if content else []
+        
+        # 圖片
+        if image_key:
+            content_blocks.append([{
+                "tag": "img",
+                "image_key": image_key,
+                "width": 800,
+                "height": 600
+            }])
+        
+        # 時間戳
+        content_blocks.append([{"tag": "text", "text": f"\n{get_local_time_str()}"}])
+        
+        return json_dumps_bytes({
+            "msg_type": "post",
+            "content": {
+                "post": {
+                    "zh_cn": {
+                        "title": "BOSS 通知",
+                        "content": content_blocks
+                    }
+                }
+            }
+        })
+    
+    @staticmethod
+    def build_wecom_body(content: str) -> bytes:
+        """企業微信 Markdown 文字 payload"""
+        return json_dumps_bytes({
+            "msgtype": "markdown",
+            "markdown": {
+                "content": f"## BOSS 通知\n\n{content}\n\n> {get_local_time_str()}"
+            }
+        })
+    
+    @staticmethod
+    def build_wecom_image_body(image_data: bytes) -> bytes:
+        """企業微信圖片 payload（Base64 + MD5）"""
+        return json_dumps_bytes({
+            "msgtype": "image",
+            "image": {
+                "base64": base64.b64encode(image_data).decode(),
+                "md5": hashlib.md5(image_data).hexdigest()  # 企業微信 API 規定使用 MD5
+            }
+        })
+    
+    # ---- 發送 ----
+    
+    @staticmethod
+    def send_to_discord(webhook_url: str, content: str, image_data: bytes = None,
+                        body: bytes = None, multipart: tuple = None) -> bool:
         """發送到 Discord Webhook"""
         try:
             if image_data:
-                files = {'file': ('screenshot.png', image_data, 'image/png')}
-                data = {'content': content}
-                response = requests.post(webhook_url, data=data, files=files, timeout=30)
+                multipart_body, content_type = multipart or MessageSender.build_discord_multipart(content, image_data)
+                response = http_session.post(webhook_url, data=multipart_body,
+                                             headers={'Content-Type': content_type}, timeout=(HTTP_CONNECT_TIMEOUT, 30))
             else:
-                payload = {"content": content}
-                response = requests.post(webhook_url, json=payload, timeout=15)
+                body = body or MessageSender.build_discord_body(content)
+                response = http_session.post(webhook_url, data=body,
+                                             headers=JSON_HEADERS, timeout=(HTTP_CONNECT_TIMEOUT, 15))
             
             return response.status_code in [200, 204]
         except Exception as e:
@@ -621,49 +1140,19 @@ class MessageSender:
             return False
     
     @staticmethod
-    def send_to_feishu(webhook_url: str, content: str, image_key: str = None) -> bool:
+    def send_to_feishu(webhook_url: str, content: str, image_key: str = None,
+                       body: bytes = None) -> bool:
         """發送到飛書 Webhook（富文本格式）"""
         try:
-            content_blocks = []
-            
-            # 文字內容
-            if content:
-                for line in content.split('\n'):
-                    if line.strip():
-                        content_blocks.append([{"tag": "text", "text": line + "\n"}])
-            
-            # 圖片
-            if image_key:
-                content_blocks.append([{
-                    "tag": "img",
-                    "image_key": image_key,
-                    "width": 800,
-                    "height": 600
-                }])
-            
-            # 時間戳
-            content_blocks.append([{"tag": "text", "text": f"\n{get_local_time_str()}"}])
-            
-            payload = {
-                "msg_type": "post",
-                "content": {
-                    "post": {
-                        "zh_cn": {
-                            "title": "BOSS 通知",
-                            "content": content_blocks
-                        }
-                    }
-                }
-            }
-            
-            response = requests.post(
-                webhook_url, json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=10
+            body = body or MessageSender.build_feishu_body(content, image_key)
+            response = http_session.post(
+                webhook_url, data=body,
+                headers=JSON_HEADERS,
+                timeout=(HTTP_CONNECT_TIMEOUT, 10)
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = json_loads(response.content)
                 return result.get('code') == 0 or result.get('StatusCode') == 0
             return False
         except Exception as e:
@@ -671,19 +1160,15 @@ class MessageSender:
             return False
     
     @staticmethod
-    def send_to_wecom(webhook_url: str, content: str, image_data: bytes = None) -> bool:
+    def send_to_wecom(webhook_url: str, content: str, image_data: bytes = None,
+                      body: bytes = None, image_body: bytes = None) -> bool:
         """發送到企業微信群機器人（支援圖片 Base64）"""
         try:
             # 發送文字（Markdown 格式）
-            text_payload = {
-                "msgtype": "markdown",
-                "markdown": {
-                    "content": f"## BOSS 通知\n\n{content}\n\n> {get_local_time_str()}"
-                }
-            }
-            
-            response = requests.post(webhook_url, json=text_payload, timeout=10)
-            result = response.json()
+            body = body or MessageSender.build_wecom_body(content)
+            response = http_session.post(webhook_url, data=body,
+                                         headers=JSON_HEADERS, timeout=(HTTP_CONNECT_TIMEOUT, 10))
+            result = json_loads(response.content)
             
             if result.get('errcode') != 0:
                 logger.error(f"企業微信文字發送失敗: {result}")
@@ -692,19 +1177,10 @@ class MessageSender:
             # 發送圖片（如果有）
             if image_data:
                 try:
-                    img_base64 = base64.b64encode(image_data).decode()
-                    img_md5 = hashlib.md5(image_data).hexdigest()
-                    
-                    image_payload = {
-                        "msgtype": "image",
-                        "image": {
-                            "base64": img_base64,
-                            "md5": img_md5
-                        }
-                    }
-                    
-                    img_response = requests.post(webhook_url, json=image_payload, timeout=30)
-                    img_result = img_response.json()
+                    image_body = image_body or MessageSender.build_wecom_image_body(image_data)
+                    img_response = http_session.post(webhook_url, data=image_body,
+                                                     headers=JSON_HEADERS, timeout=(HTTP_CONNECT_TIMEOUT, 30))
+                    img_result = json_loads(img_response.content)
                     
                     if img_result.get('errcode') != 0:
                         logger.warning(f"企業微信圖片發送失敗: {img_result.get('errmsg')}")
@@ -727,16 +1203,33 @@ class BossGroup:
     MODE_SYNC = 'sync'
     MODE_ROUND_ROBIN = 'round_robin'
     
+    # 純文字訊息含有這些關鍵字時不發送（BOSS 檢測的文字通知）
+    FILTER_KEYWORDS = ("偵測到HP血條", "BOSS存在", "⏰ 時間:", "🩸")
+    BATCH_SEPARATOR = "\n---\n"
+    
     def __init__(self, group_id: str, display_name: str = None):
         self.group_id = group_id.lower()
         self.display_name = display_name or f"{group_id.upper()} BOSS"
         self.webhooks: list = []
+        self._webhooks_by_id = {}  # Webhook ID -> WebhookItem（與 webhooks 列表同步）
+        self._webhook_urls = set()  # 已加入的 Webhook URL（新增時檢查重複）
+        self._enabled_cache = ((), (), ())  # (啟用, 啟用且非固定, 啟用且固定)，Webhook 異動時重建
         self.send_mode = self.MODE_SYNC
         self.current_index = 0
         self.lock = threading.Lock()
-        self.stats = {"received": 0, "total_sent": 0, "total_failed": 0}
+        self._stats_lock = threading.Lock()  # 計數器專用（發送期間不持有 self.lock）
+        self.stats = {"received": 0, "total_sent": 0, "total_failed": 0, "dropped": 0}
         self.history = deque(maxlen=50)
+        self.version = 0  # 狀態版本號，每次中繼後遞增（供統計快取判斷）
         self._save_callback = None
+        self._recent = OrderedDict()  # 訊息指紋 -> 到期時間（重複訊息過濾）
+        self._recent_lock = threading.Lock()
+        self._batch = []  # 合併視窗內待發送的文字訊息
+        self._batch_source = "unknown"
+        self._batch_timer = None
+        self._batch_lock = threading.Lock()
+        self._tokens = RATE_LIMIT_PER_SECOND  # 令牌桶（與 _tokens_at 一起由 _stats_lock 保護）
+        self._tokens_at = time.monotonic()
     
     def set_save_callback(self, callback):
         """設置保存回調函數"""
@@ -747,6 +1240,40 @@ class BossGroup:
         if self._save_callback:
             self._save_callback()
     
+    def _is_duplicate(self, content: str, image_hash: str) -> bool:
+        """
+        檢查 DEDUPE_SECONDS 秒內是否已收到相同的內容與圖片
+        
+        第一次出現時記錄指紋並回傳 False，期限內再次出現回傳 True
+        """
+        if DEDUPE_SECONDS <= 0:
+            return False
+        
+        key = hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+        if image_hash:
+            key += image_hash.encode('ascii')
+        now = time.monotonic()
+        
+        with self._recent_lock:
+            # 依插入順序淘汰已過期的指紋
+            while self._recent:
+                if next(iter(self._recent.values())) > now:
+                    break
+                self._recent.popitem(last=False)
+            
+            if key in self._recent:
+                return True
+            self._recent[key] = now + DEDUPE_SECONDS
+            return False
+    
+    def _add_history(self, entry: dict):
+        """新增一筆中繼記錄並遞增版本號（內容與狀態在寫入時先做 HTML 跳脫）"""
+        entry["content"] = str(escape(entry["content"]))
+        entry["status"] = str(escape(entry["status"]))
+        with self._stats_lock:  # 中繼在群組鎖外完成，多筆可能同時寫入
+            self.history.appendleft(entry)
+            self.version += 1
+    
     # ---- 模式管理 ----
     
     def set_send_mode(self, mode: str) -> tuple:
@@ -761,6 +1288,22 @@ class BossGroup:
     
     # ---- Webhook CRUD ----
     
+    def append_webhook(self, webhook: WebhookItem):
+        """加入已建立的 WebhookItem（同步更新 ID 與 URL 索引）"""
+        self.webhooks.append(webhook)
+        self._webhooks_by_id[webhook.id] = webhook
+        self._webhook_urls.add(webhook.url)
+        self._rebuild_enabled_cache()
+    
+    def _rebuild_enabled_cache(self):
+        """重建啟用 / 固定 Webhook 快取（新增、移除、啟用或固定狀態變更後呼叫）"""
+        enabled = tuple(wh for wh in self.webhooks if wh.enabled)
+        self._enabled_cache = (
+            enabled,
+            tuple(wh for wh in enabled if not wh.is_fixed),
+            tuple(wh for wh in enabled if wh.is_fixed),
+        )
+    
     def add_webhook(self, url: str, name: str = None, webhook_type: str = 'discord',
                     is_fixed: bool = False) -> tuple:
         """添加新的 Webhook"""
@@ -768,14 +1311,14 @@ class BossGroup:
             if not url or not url.startswith("https://"):
                 return False, "無效的 URL（必須以 https:// 開頭）"
             
-            if any(wh.url == url for wh in self.webhooks):
+            if url in self._webhook_urls:
                 return False, "此 Webhook URL 已存在"
             
             if webhook_type not in ['discord', 'feishu', 'wecom']:
                 return False, "類型必須是 'discord'、'feishu' 或 'wecom'"
             
             webhook = WebhookItem(url, name, webhook_type, enabled=True, is_fixed=is_fixed)
-            self.webhooks.append(webhook)
+            self.append_webhook(webhook)
             
             fixed_text = " (固定)" if is_fixed else ""
             logger.info(f"[{self.group_id}] 添加 {webhook_type} Webhook: {webhook.name}{fixed_text}")
@@ -785,65 +1328,88 @@ class BossGroup:
     def remove_webhook(self, webhook_id: str) -> bool:
         """移除 Webhook"""
         with self.lock:
-            for i, wh in enumerate(self.webhooks):
-                if wh.id == webhook_id:
-                    removed = self.webhooks.pop(i)
-                    if self.current_index >= len(self.webhooks) and len(self.webhooks) > 0:
-                        self.current_index = 0
-                    logger.info(f"[{self.group_id}] 移除 Webhook: {removed.name}")
-                    self._trigger_save()
-                    return True
-            return False
+            removed = self._webhooks_by_id.pop(webhook_id, None)
+            if not removed:
+                return False
+            self.webhooks.remove(removed)
+            # 舊配置可能有重複 URL，仍有其他 Webhook 使用時保留在索引中
+            if not any(wh.url == removed.url for wh in self.webhooks):
+                self._webhook_urls.discard(removed.url)
+            self._rebuild_enabled_cache()
+            if self.current_index >= len(self.webhooks) and len(self.webhooks) > 0:
+                self.current_index = 0
+            logger.info(f"[{self.group_id}] 移除 Webhook: {removed.name}")
+            self._trigger_save()
+            return True
     
     def toggle_webhook(self, webhook_id: str, enabled: bool) -> tuple:
         """啟用/禁用 Webhook"""
         with self.lock:
-            for wh in self.webhooks:
-                if wh.id == webhook_id:
-                    wh.enabled = enabled
-                    self._trigger_save()
-                    return True, f"{wh.name} 已{'啟用' if enabled else '禁用'}"
-            return False, "找不到此 Webhook"
+            wh = self._webhooks_by_id.get(webhook_id)
+            if not wh:
+                return False, "找不到此 Webhook"
+            wh.enabled = enabled
+            self._rebuild_enabled_cache()
+            self._trigger_save()
+            return True, f"{wh.name} 已{'啟用' if enabled else '禁用'}"
     
     def toggle_webhook_fixed(self, webhook_id: str, is_fixed: bool) -> tuple:
         """切換 Webhook 的固定狀態"""
         with self.lock:
-            for wh in self.webhooks:
-                if wh.id == webhook_id:
-                    wh.is_fixed = is_fixed
-                    self._trigger_save()
-                    return True, f"{wh.name} {'已設為' if is_fixed else '已取消'}固定發送"
-            return False, "找不到此 Webhook"
+            wh = self._webhooks_by_id.get(webhook_id)
+            if not wh:
+                return False, "找不到此 Webhook"
+            wh.is_fixed = is_fixed
+            self._rebuild_enabled_cache()
+            self._trigger_save()
+            return True, f"{wh.name} {'已設為' if is_fixed else '已取消'}固定發送"
     
     def update_webhook(self, webhook_id: str, name: str = None) -> tuple:
         """更新 Webhook 名稱"""
         with self.lock:
-            for wh in self.webhooks:
-                if wh.id == webhook_id and name:
-                    wh.name = name
-                    self._trigger_save()
-                    return True, f"已重命名為: {name}"
-            return False, "找不到此 Webhook"
+            wh = self._webhooks_by_id.get(webhook_id)
+            if not wh or not name:
+                return False, "找不到此 Webhook"
+            wh.name = name
+            self._trigger_save()
+            return True, f"已重命名為: {name}"
+    
+    def set_webhook_schedule(self, webhook_id: str, schedule_mode: str, schedules: list = None) -> tuple:
+        """設定 Webhook 的排程模式與時段（schedules 為 None 時保留原有時段）"""
+        with self.lock:
+            wh = self._webhooks_by_id.get(webhook_id)
+            if not wh:
+                return False, "找不到此 Webhook"
+            wh.schedule_mode = schedule_mode
+            if schedules is not None:
+                wh.schedules = schedules
+            self._trigger_save()
+            if wh.schedule_mode != 'off':
+                return True, f"{wh.name} 排程已更新 ({len(wh.schedules)} 筆)"
+            return True, f"{wh.name} 排程已關閉"
     
     # ---- 查詢方法 ----
     
-    def get_enabled_webhooks(self, exclude_fixed: bool = False) -> list:
-        """獲取啟用的 Webhook（可選擇排除固定的）"""
-        webhooks = [wh for wh in self.webhooks if wh.enabled]
-        if exclude_fixed:
-            webhooks = [wh for wh in webhooks if not wh.is_fixed]
-        return webhooks
+    def get_webhook(self, webhook_id: str):
+        """依 ID 取得 Webhook（找不到時回傳 None）"""
+        return self._webhooks_by_id.get(webhook_id)
+    
+    def get_enabled_webhooks(self, exclude_fixed: bool = False) -> tuple:
+        """獲取啟用的 Webhook（可選擇排除固定的；回傳共用快取，勿修改）"""
+        return self._enabled_cache[1 if exclude_fixed else 0]
     
-    def get_fixed_webhooks(self) -> list:
-        """獲取固定的 Webhook"""
-        return [wh for wh in self.webhooks if wh.is_fixed and wh.enabled]
+    def get_fixed_webhooks(self) -> tuple:
+        """獲取固定的 Webhook（回傳共用快取，勿修改）"""
+        return self._enabled_cache[2]
     
-    def get_next_webhook_round_robin(self) -> tuple:
+    def get_next_webhook_round_robin(self, now: datetime = None) -> tuple:
         """
         [v4.4 修正] 輪詢模式取下一個 Webhook
         
         修正邏輯：
         - 遍歷所有啟用的非固定 Webhook，跳過不在排程內的
+        - 斷路器暫停中的也跳過，輪到下一個正常的；全部都暫停時才回傳第一個暫停中的
+          （由 dispatch 記為暫停，不計入失敗）
         - 只有成功找到在排程內的 Webhook 才消耗 index
         - 如果全部都不在排程內，返回 (None, skipped_list)
         
@@ -855,6 +1421,7 @@ class BossGroup:
             return None, []
         
         skipped = []
+        paused = None  # 第一個在排程內但斷路器暫停中的
         total = len(enabled)
         
         # 最多嘗試所有啟用的 webhook
@@ -863,206 +1430,424 @@ class BossGroup:
             candidate = enabled[self.current_index]
             self.current_index = (self.current_index + 1) % total
             
-            if candidate.is_in_schedule():
-                return candidate, skipped
-            else:
+            if not candidate.is_in_schedule(now):
                 skipped.append(candidate)
-                logger.info(f"[{self.group_id}] 輪詢跳過 {candidate.name}（不在排程內）")
+                logger.info("[%s] 輪詢跳過 %s（不在排程內）", self.group_id, candidate.name)
+            elif candidate.is_circuit_open():
+                if paused is None:
+                    paused = candidate
+                logger.info("[%s] 輪詢跳過 %s（暫停發送中）", self.group_id, candidate.name)
+            else:
+                return candidate, skipped
         
-        # 全部都不在排程內
-        return None, skipped
+        # 沒有可發送的：全部暫停或不在排程內
+        return paused, skipped
+    
+    def get_next_webhook_id(self) -> str:
+        """輪詢模式下一個輪到的 Webhook ID（供 UI 標示，不消耗 index）"""
+        if self.send_mode != self.MODE_ROUND_ROBIN:
+            return None
+        enabled = self.get_enabled_webhooks(exclude_fixed=True)
+        if not enabled:
+            return None
+        return enabled[self.current_index % len(enabled)].id
     
     # ---- 消息中繼 ----
     
+    def allow_message(self) -> bool:
+        """令牌桶限流：每秒補充 RATE_LIMIT_PER_SECOND 個令牌，不足時拒絕並計入 dropped"""
+        if RATE_LIMIT_PER_SECOND <= 0:
+            return True
+        now = time.monotonic()
+        with self._stats_lock:
+            self._tokens = min(RATE_LIMIT_PER_SECOND,
+                               self._tokens + (now - self._tokens_at) * RATE_LIMIT_PER_SECOND)
+            self._tokens_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.stats["dropped"] += 1
+            return False
+    
+    def enqueue_message(self, content: str, image_data: bytes = None,
+                        source_ip: str = "unknown", image_url: str = None) -> bool:
+        """
+        將訊息放入中繼佇列，由背景執行緒呼叫 relay_message 發送
+        
+        啟用 WEBHOOK_BATCH_WINDOW_MS 時，純文字訊息會先暫存，視窗結束或累積
+        WEBHOOK_BATCH_MAX 則後合併成一則入列；來源 IP 與暫存中的不同時先送出暫存的，
+        每批只含同一來源；含圖片或會被過濾的訊息直接入列
+        image_url：尚未下載的遠端圖片，由背景執行緒下載後再中繼
+        
+        Returns:
+            bool: 是否成功入列（佇列已滿時回傳 False）
+        """
+        if image_url:
+            return self._put_relay(content, None, source_ip, image_url=image_url)
+        if (WEBHOOK_BATCH_WINDOW_MS <= 0 or image_data
+                or self._is_filtered_text(content, image_data)):
+            return self._put_relay(content, image_data, source_ip)
+        
+        with self._batch_lock:
+            if self._batch and self._batch_source != source_ip:
+                # 來源不同：先送出暫存的批次（在鎖內入列以保持順序；先前的訊息都已回覆 202，
+                # 入列失敗時由 _put_relay 計入 dropped）
+                previous, previous_source = self._take_batch()
+                self._put_relay(self.BATCH_SEPARATOR.join(previous), None, previous_source, previous)
+            self._batch.append(content)
+            self._batch_source = source_ip
+            if len(self._batch) < WEBHOOK_BATCH_MAX:
+                if self._batch_timer is None:
+                    self._batch_timer = threading.Timer(WEBHOOK_BATCH_WINDOW_MS / 1000,
+                                                        self._flush_batch)
+                    self._batch_timer.daemon = True
+                    self._batch_timer.start()
+                batch = None
+            else:
+                batch, source_ip = self._take_batch()
+        if batch is None:
+            return True
+        return self._put_relay(self.BATCH_SEPARATOR.join(batch), None, source_ip, batch)
+    
+    def _take_batch(self) -> tuple:
+        """取出暫存的文字訊息並取消計時器（呼叫前需持有 _batch_lock）"""
+        batch, self._batch = self._batch, []
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        return batch, self._batch_source
+    
+    def _flush_batch(self):
+        """合併視窗到期：把暫存的文字訊息合併成一則入列"""
+        with self._batch_lock:
+            batch, source_ip = self._take_batch()
+        if batch:
+            self._put_relay(self.BATCH_SEPARATOR.join(batch), None, source_ip, batch)
+    
+    def _put_relay(self, content: str, image_data: bytes, source_ip: str,
+                   parts: list = None, image_url: str = None) -> bool:
+        """放入中繼佇列（parts 為合併前的各則訊息；佇列已滿時回傳 False）"""
+        try:
+            relay_queue.put_nowait((self, content, image_data, source_ip, parts, image_url))
+            return True
+        except queue.Full:
+            # 合併的批次包含多則已回覆 202 的訊息，逐則計入
+            self.record_dropped("中繼佇列已滿，拒絕訊息", len(parts) if parts else 1)
+            return False
+    
+    def record_dropped(self, reason: str, count: int = 1):
+        """記錄未能中繼而被捨棄的訊息"""
+        logger.warning("[%s] %s", self.group_id, reason)
+        with self._stats_lock:
+            self.stats["dropped"] += count
+    
+    def record_download_failed(self, source_ip: str):
+        """只有附件的訊息下載失敗：呼叫端已收到 202，記為捨棄並寫入歷史"""
+        self.record_dropped("附件下載失敗，訊息已捨棄")
+        self._add_history({
+            "time": get_local_time_str(),
+            "content": "",
+            "status": "附件下載失敗",
+            "source": source_ip[-15:],
+            "has_image": True,
+            "mode": "捨棄"
+        })
+    
+    def _is_filtered_text(self, content: str, image_data: bytes) -> bool:
+        """是否為要過濾的純文字 BOSS 檢測訊息"""
+        return (not image_data and bool(content)
+                and any(keyword in content for keyword in self.FILTER_KEYWORDS))
+    
     def relay_message(self, content: str, image_data: bytes = None, 
-                      source_ip: str = "unknown") -> tuple:
+                      source_ip: str = "unknown", parts: list = None) -> tuple:
         """
         中繼訊息到 Webhook
         
         過濾規則：如果沒有圖片且包含 BOSS 檢測關鍵字，則不發送
+        parts：合併視窗內的各則原始訊息（Discord 以多個 embed 一次送出）
         
         Returns:
             tuple: (成功與否, 訊息, 詳細結果列表)
         """
+        # 各種結果寫入歷史時共用的欄位
+        preview = (content[:50] + "...") if len(content) > 50 else content
+        source = source_ip[-15:]
+        has_image = bool(image_data)
+        
         # 過濾純文字 BOSS 檢測訊息
-        if not image_data and content:
-            filter_keywords = ["偵測到HP血條", "BOSS存在", "⏰ 時間:", "🩸"]
-            
-            if any(keyword in content for keyword in filter_keywords):
-                logger.info(f"[{self.group_id}] 過濾純文字 BOSS 檢測訊息")
-                self.history.appendleft({
-                    "time": get_local_time_str(),
-                    "content": content[:50],
-                    "status": "已過濾（純文字）",
-                    "source": source_ip[-15:],
-                    "has_image": False,
-                    "mode": "過濾"
-                })
-                return True, "已過濾", []
+        if self._is_filtered_text(content, image_data):
+            logger.info("[%s] 過濾純文字 BOSS 檢測訊息", self.group_id)
+            self._add_history({
+                "time": get_local_time_str(),
+                "content": preview,
+                "status": "已過濾（純文字）",
+                "source": source,
+                "has_image": has_image,
+                "mode": "過濾"
+            })
+            return True, "已過濾", []
+        
+        # 過濾短時間內重複送達的相同訊息
+        image_hash = image_digest(image_data) if image_data else None
+        if self._is_duplicate(content, image_hash):
+            logger.info("[%s] %g 秒內重複訊息，已略過", self.group_id, DEDUPE_SECONDS)
+            self._add_history({
+                "time": get_local_time_str(),
+                "content": preview,
+                "status": "重複訊息（已略過）",
+                "source": source,
+                "has_image": has_image,
+                "mode": "過濾"
+            })
+            return True, "重複訊息，已略過", []
         
         # 正常發送流程
-        self.stats["received"] += 1
+        with self._stats_lock:
+            self.stats["received"] += 1
         timestamp = get_local_time_str()
+        now = get_local_time()  # 本則訊息所有排程判斷共用同一時間點
         results = []
         
         # 飛書圖片預上傳（如果有啟用的飛書 Webhook 且在排程內）
         feishu_image_key = None
         if image_data:
             has_active_feishu = any(
-                wh.enabled and wh.webhook_type == 'feishu' and wh.is_in_schedule()
-                for wh in self.webhooks
+                wh.webhook_type == 'feishu' and wh.is_in_schedule(now)
+                for wh in self._enabled_cache[0]
             )
             if has_active_feishu:
-                feishu_image_key = feishu_uploader.upload_image(image_data)
+                feishu_image_key = feishu_uploader.upload_image(image_data, image_hash)
+        
+        payloads = {}  # 本次中繼共用的已序列化 payload（依類型延遲建構）
+        if parts and len(parts) > 1:
+            payloads['discord'] = MessageSender.build_discord_batch_body(content, parts)
+        pending = []   # (結果項目, Future)：發送中的 Webhook
+        
+        def dispatch(wh: WebhookItem, is_fixed: bool):
+            """提交發送任務，先佔好結果項目的位置以保持顯示順序"""
+            entry = {
+                "name": wh.name, "type": wh.webhook_type,
+                "success": False, "is_fixed": is_fixed, "skipped": False,
+                "circuit_open": False
+            }
+            results.append(entry)
+            if wh.is_circuit_open():
+                # 斷路器暫停中：不佔用執行緒，也不計入失敗與端點統計
+                entry["circuit_open"] = True
+                return
+            pending.append((entry, send_executor.submit(
+                self._send_to_webhook, wh, content, image_data, feishu_image_key, payloads
+            )))
+        
+        # 同步模式只讀取啟用快取（整組 tuple 一次替換，讀一次即為一致快照），不需加鎖；
+        # 輪詢模式要推進 index 才持鎖。排程判斷與網路 IO 都在鎖外，
+        # 避免慢速端點卡住同群組的新增/刪除/切換等操作
+        send_mode = self.send_mode
+        if send_mode == self.MODE_SYNC:
+            _, enabled_webhooks, fixed_webhooks = self._enabled_cache
+        else:
+            with self.lock:
+                fixed_webhooks = self.get_fixed_webhooks()
+                webhook, skipped_webhooks = self.get_next_webhook_round_robin(now)
         
-        with self.lock:
-            # 1. 先發送固定的 Webhook（仍受排程限制）
-            fixed_webhooks = self.get_fixed_webhooks()
-            for wh in fixed_webhooks:
-                if wh.is_in_schedule():
-                    success = self._send_to_webhook(wh, content, image_data, feishu_image_key)
-                    results.append({
-                        "name": wh.name, "type": wh.webhook_type,
-                        "success": success, "is_fixed": True, "skipped": False
-                    })
+        # 1. 先發送固定的 Webhook（仍受排程限制）
+        for wh in fixed_webhooks:
+            if wh.is_in_schedule(now):
+                dispatch(wh, True)
+            else:
+                logger.info("[%s] 固定 %s 不在排程內，已跳過", self.group_id, wh.name)
+                results.append({
+                    "name": wh.name, "type": wh.webhook_type,
+                    "success": False, "is_fixed": True, "skipped": True
+                })
+        
+        # 2. 根據模式發送非固定的 Webhook
+        if send_mode == self.MODE_SYNC:
+            # 同步模式：發送到所有啟用且在排程內的
+            if not enabled_webhooks and not fixed_webhooks:
+                self._add_history({
+                    "time": timestamp, "content": preview,
+                    "status": "無啟用的 Webhook", "source": source,
+                    "has_image": has_image, "mode": "同步"
+                })
+                return False, "無啟用的 Webhook", []
+            
+            for wh in enabled_webhooks:
+                if wh.is_in_schedule(now):
+                    dispatch(wh, False)
                 else:
-                    logger.info(f"[{self.group_id}] 固定 {wh.name} 不在排程內，已跳過")
+                    logger.info("[%s] %s 不在排程內，已跳過", self.group_id, wh.name)
                     results.append({
                         "name": wh.name, "type": wh.webhook_type,
-                        "success": False, "is_fixed": True, "skipped": True
-                    })
-            
-            # 2. 根據模式發送非固定的 Webhook
-            if self.send_mode == self.MODE_SYNC:
-                # 同步模式：發送到所有啟用且在排程內的
-                enabled_webhooks = self.get_enabled_webhooks(exclude_fixed=True)
-                
-                if not enabled_webhooks and not fixed_webhooks:
-                    self.history.appendleft({
-                        "time": timestamp, "content": content[:50],
-                        "status": "無啟用的 Webhook", "source": source_ip[-15:],
-                        "has_image": bool(image_data), "mode": "同步"
-                    })
-                    return False, "無啟用的 Webhook", []
-                
-                for wh in enabled_webhooks:
-                    if wh.is_in_schedule():
-                        success = self._send_to_webhook(wh, content, image_data, feishu_image_key)
-                        results.append({
-                            "name": wh.name, "type": wh.webhook_type,
-                            "success": success, "is_fixed": False, "skipped": False
-                        })
-                    else:
-                        logger.info(f"[{self.group_id}] {wh.name} 不在排程內，已跳過")
-                        results.append({
-                            "name": wh.name, "type": wh.webhook_type,
-                            "success": False, "is_fixed": False, "skipped": True
-                        })
-            else:
-                # 輪詢模式：自動跳過不在排程內的，嘗試下一個
-                webhook, skipped_webhooks = self.get_next_webhook_round_robin()
-                
-                for skipped_wh in skipped_webhooks:
-                    results.append({
-                        "name": skipped_wh.name, "type": skipped_wh.webhook_type,
                         "success": False, "is_fixed": False, "skipped": True
                     })
-                
-                if not webhook and not fixed_webhooks:
-                    skip_msg = "所有 Webhook 都不在排程內" if skipped_webhooks else "無啟用的 Webhook"
-                    self.history.appendleft({
-                        "time": timestamp, "content": content[:50],
-                        "status": skip_msg, "source": source_ip[-15:],
-                        "has_image": bool(image_data), "mode": "輪詢"
-                    })
-                    return False, skip_msg, results
-                
-                if webhook:
-                    success = self._send_to_webhook(webhook, content, image_data, feishu_image_key)
-                    results.append({
-                        "name": webhook.name, "type": webhook.webhook_type,
-                        "success": success, "is_fixed": False, "skipped": False
-                    })
+        else:
+            # 輪詢模式：自動跳過不在排程內的，嘗試下一個
+            for skipped_wh in skipped_webhooks:
+                results.append({
+                    "name": skipped_wh.name, "type": skipped_wh.webhook_type,
+                    "success": False, "is_fixed": False, "skipped": True
+                })
+            
+            if not webhook and not fixed_webhooks:
+                skip_msg = "所有 Webhook 都不在排程內" if skipped_webhooks else "無啟用的 Webhook"
+                self._add_history({
+                    "time": timestamp, "content": preview,
+                    "status": skip_msg, "source": source,
+                    "has_image": has_image, "mode": "輪詢"
+                })
+                return False, skip_msg, results
+            
+            if webhook:
+                dispatch(webhook, False)
+        
+        # 等待所有並行發送完成（已釋放群組鎖）；逾時的端點仍在背景完成並自行記錄統計
+        deadline = time.monotonic() + SEND_WAIT_SECONDS
+        for entry, future in pending:
+            try:
+                entry["success"] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                logger.warning("[%s] TIMEOUT -> %s", self.group_id, entry["name"])
         
         # 統計結果
         success_count = sum(1 for r in results if r["success"])
-        fail_count = sum(1 for r in results if not r["success"] and not r.get("skipped"))
+        fail_count = sum(1 for r in results
+                         if not r["success"] and not r.get("skipped") and not r.get("circuit_open"))
         skipped_count = sum(1 for r in results if r.get("skipped"))
-        self.stats["total_sent"] += success_count
-        self.stats["total_failed"] += fail_count
+        paused_count = sum(1 for r in results if r.get("circuit_open"))
+        with self._stats_lock:
+            self.stats["total_sent"] += success_count
+            self.stats["total_failed"] += fail_count
         
         # 組裝狀態字串
         status_parts = []
         for r in results:
-            mark = '[跳過]' if r.get("skipped") else ('[OK]' if r['success'] else '[失敗]')
+            if r.get("skipped"):
+                mark = '[跳過]'
+            elif r.get("circuit_open"):
+                mark = '[暫停]'
+            else:
+                mark = '[OK]' if r['success'] else '[失敗]'
             type_label = {'discord': 'DC', 'feishu': '飛書', 'wecom': '微信'}.get(r['type'], '?')
             status_parts.append(f"{mark}{type_label}{r['name'][:8]}")
         
-        mode_name = "同步" if self.send_mode == self.MODE_SYNC else "輪詢"
+        mode_name = "同步" if send_mode == self.MODE_SYNC else "輪詢"
         
         message_parts = [f"成功: {success_count}"]
         if fail_count > 0:
             message_parts.append(f"失敗: {fail_count}")
         if skipped_count > 0:
             message_parts.append(f"排程外: {skipped_count}")
+        if paused_count > 0:
+            message_parts.append(f"暫停: {paused_count}")
         
-        self.history.appendleft({
+        self._add_history({
             "time": timestamp,
-            "content": (content[:50] + "...") if len(content) > 50 else content,
+            "content": preview,
             "status": " | ".join(status_parts),
-            "source": source_ip[-15:],
-            "has_image": bool(image_data),
+            "source": source,
+            "has_image": has_image,
             "mode": mode_name
         })
         
         return success_count > 0, f"[{mode_name}] {', '.join(message_parts)}", results
     
+    @staticmethod
+    def _get_payload(payloads: dict, key: str, builder, *args) -> bytes:
+        """取得本次中繼的 payload，第一次使用時才建構"""
+        body = payloads.get(key)
+        if body is None:
+            body = payloads[key] = builder(*args)
+        return body
+    
     def _send_to_webhook(self, webhook: WebhookItem, content: str,
-                         image_data: bytes, feishu_image_key: str) -> bool:
-        """發送訊息到指定 Webhook"""
+                         image_data: bytes, feishu_image_key: str,
+                         payloads: dict = None) -> bool:
+        """發送訊息到指定 Webhook（payloads 為同一則訊息共用的序列化結果）"""
+        if payloads is None:
+            payloads = {}
         try:
             if webhook.webhook_type == 'discord':
-                success = MessageSender.send_to_discord(webhook.url, content, image_data)
+                if image_data:
+                    multipart = self._get_payload(payloads, 'discord_multipart',
+                                                  MessageSender.build_discord_multipart, content, image_data)
+                    success = MessageSender.send_to_discord(webhook.url, content, image_data, multipart=multipart)
+                else:
+                    body = self._get_payload(payloads, 'discord', MessageSender.build_discord_body, content)
+                    success = MessageSender.send_to_discord(webhook.url, content, body=body)
             elif webhook.webhook_type == 'feishu':
-                success = MessageSender.send_to_feishu(webhook.url, content, feishu_image_key)
+                body = self._get_payload(payloads, 'feishu', MessageSender.build_feishu_body,
+                                         content, feishu_image_key)
+                success = MessageSender.send_to_feishu(webhook.url, content, feishu_image_key, body=body)
             elif webhook.webhook_type == 'wecom':
-                success = MessageSender.send_to_wecom(webhook.url, content, image_data)
+                body = self._get_payload(payloads, 'wecom', MessageSender.build_wecom_body, content)
+                image_body = None
+                if image_data:
+                    image_body = self._get_payload(payloads, 'wecom_image',
+                                                   MessageSender.build_wecom_image_body, image_data)
+                success = MessageSender.send_to_wecom(webhook.url, content, image_data,
+                                                      body=body, image_body=image_body)
             else:
                 success = False
             
+            self._record_send(webhook, success)
             if success:
-                webhook.stats["sent"] += 1
-                logger.info(f"[{self.group_id}] OK -> {webhook.name}")
+                logger.info("[%s] OK -> %s", self.group_id, webhook.name)
             else:
-                webhook.stats["failed"] += 1
-                logger.error(f"[{self.group_id}] FAIL -> {webhook.name}")
+                logger.error("[%s] FAIL -> %s", self.group_id, webhook.name)
             
             return success
         except Exception as e:
-            webhook.stats["failed"] += 1
-            logger.error(f"[{self.group_id}] ERROR -> {webhook.name}: {e}")
+            self._record_send(webhook, False)
+            logger.error("[%s] ERROR -> %s: %s", self.group_id, webhook.name, e)
             return False
     
+    def _record_send(self, webhook: WebhookItem, success: bool):
+        """記錄單次發送結果（計數與斷路器，遞增版本號讓定期保存與統計快取察覺變更）"""
+        with self._stats_lock:
+            webhook.stats["sent" if success else "failed"] += 1
+            tripped = webhook.record_result(success)
+            self.version += 1
+        if tripped:
+            logger.warning("[%s] %s 連續失敗 %d 次，暫停發送 %d 秒", self.group_id, webhook.name,
+                           WebhookItem.CIRCUIT_FAILURES, WebhookItem.CIRCUIT_SECONDS)
+    
     # ---- 序列化 ----
     
-    def get_stats(self) -> dict:
-        """獲取群組統計資訊"""
-        return {
+    def get_stats(self, now: datetime = None, include_webhooks: bool = True) -> dict:
+        """
+        獲取群組統計資訊（now 由 get_all_stats 傳入，整份快照共用同一時間點）
+        
+        include_webhooks=False 時省略 webhooks 與 history 明細，只回傳計數
+        """
+        # 計數與歷史在 _stats_lock 下取快照，避免讀到中繼寫到一半的狀態
+        with self._stats_lock:
+            stats = dict(self.stats)
+            history = list(islice(self.history, 20)) if include_webhooks else None
+        received = stats["received"]
+        total_sent = stats["total_sent"]
+        result = {
             "group_id": self.group_id,
             "display_name": self.display_name,
+            "display_name_html": escape_html(self.display_name),
             "send_mode": self.send_mode,
             "send_mode_name": "同步模式" if self.send_mode == self.MODE_SYNC else "輪詢模式",
             "webhooks_total": len(self.webhooks),
             "webhooks_enabled": len(self.get_enabled_webhooks()),
             "webhooks_fixed": len(self.get_fixed_webhooks()),
             "current_index": self.current_index,
-            "received": self.stats["received"],
-            "total_sent": self.stats["total_sent"],
-            "total_failed": self.stats["total_failed"],
-            "success_rate": f"{(self.stats['total_sent'] / max(1, self.stats['received']) * 100):.1f}%",
-            "webhooks": [wh.to_dict() for wh in self.webhooks],
-            "history": list(self.history)[:20]
+            "next_webhook_id": self.get_next_webhook_id(),
+            "received": received,
+            "total_sent": total_sent,
+            "total_failed": stats["total_failed"],
+            "dropped": stats["dropped"],
+            "success_rate": f"{(total_sent / max(1, received) * 100):.1f}%",
         }
+        if include_webhooks:
+            now = now or get_local_time()
+            result["webhooks"] = [wh.to_dict(now) for wh in self.webhooks]
+            result["history"] = history
+        return result
     
     def to_save_dict(self) -> dict:
         """轉換為保存格式"""
@@ -1082,15 +1867,89 @@ class BossGroup:
         
         for wh_data in data.get('webhooks', []):
             webhook = WebhookItem.from_dict(wh_data)
-            group.webhooks.append(webhook)
+            group.append_webhook(webhook)
         
         return group
 
 
+# ================================================================================
+# 背景配置寫入器
+# ================================================================================
+
+def _fsync_dir(path: str):
+    """將目錄項目落盤，讓 os.replace 的改名在斷電後仍然有效（Windows 不支援，略過）"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ConfigWriter:
+    """
+    背景配置寫入器 - 合併短時間內的多次修改為一次寫入
+    
+    mark_dirty() 只設定旗標並喚醒寫入執行緒，不會阻塞呼叫端；
+    執行緒等到 DEBOUNCE 秒內沒有新的修改才寫入，持續修改時最多延遲 MAX_DELAY 秒
+    """
+    
+    DEBOUNCE = 0.5
+    MAX_DELAY = 5.0
+    
+    def __init__(self, save_func):
+        self.save_func = save_func
+        self._dirty = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='config-writer', daemon=True)
+        self._thread.start()
+    
+    def mark_dirty(self):
+        """標記配置已修改"""
+        self._dirty.set()
+    
+    def stop(self):
+        """停止寫入執行緒（程式結束前呼叫，最後一次保存由呼叫端負責）"""
+        self._stopped = True
+        self._dirty.set()
+        self._thread.join(timeout=5)
+    
+    def _run(self):
+        while True:
+            self._dirty.wait()
+            if self._stopped:
+                return
+            started = time.monotonic()
+            while True:
+                self._dirty.clear()
+                if not self._dirty.wait(self.DEBOUNCE):
+                    break
+                if self._stopped:
+                    return
+                if time.monotonic() - started >= self.MAX_DELAY:
+                    break  # 旗標保持設定，寫入後會再寫一次最新狀態
+            self.save_func()
+
+
 # ================================================================================
 # 中繼站管理器（帶持久化 + 飛書憑證管理）
 # ================================================================================
 
+_GROUP_ID_INVALID = re.compile(r'[^a-z0-9_]')
+
+
+@lru_cache(maxsize=1024)
+def normalize_group_id(group_id: str) -> str:
+    """群組 ID 正規化：轉小寫並移除英數與底線以外的字元（結果快取）"""
+    return _GROUP_ID_INVALID.sub('', group_id.lower()) or "default"
+
+
 class WebhookRelayManager:
     """Webhook 中繼站管理器 - 支援持久化存儲 + 飛書憑證管理"""
     
@@ -1098,14 +1957,24 @@ class WebhookRelayManager:
         self.groups = {}
         self.lock = threading.Lock()
         self.start_time = get_local_time()
-        self._save_lock = threading.Lock()
-        self._save_timer = None
+        self.config_writer = ConfigWriter(self._save_config_sync)
+        self._save_lock = threading.Lock()  # 背景寫入、強制保存與結束保存共用同一個臨時文件，需序列化
+        
+        # 統計快取
+        self.version = 0
+        self._stats_cache = {}  # include_webhooks -> (快取鍵, 已序列化的 JSON bytes)
+        self._saved_version = None  # 最後一次成功寫入時的 state_version()
+        self._saved_digest = None   # 最後一次寫入內容（不含 updated_at）的雜湊
+        self._auto_group_tokens = AUTO_GROUPS_PER_MINUTE  # 自動建立群組的令牌桶（由 lock 保護）
+        self._auto_group_at = time.monotonic()
         
         self.feishu_app_id = FEISHU_APP_ID
         self.feishu_app_secret = FEISHU_APP_SECRET
         
         self._load_config()
-        atexit.register(self._save_config_sync)
+        atexit.register(self._shutdown)
+        if STATS_SAVE_SECONDS > 0:
+            threading.Thread(target=self._stats_save_loop, name='stats-saver', daemon=True).start()
         
         logger.info("=" * 60)
         logger.info("Webhook 中繼站 v4.5 啟動")
@@ -1124,8 +1993,8 @@ class WebhookRelayManager:
         # 1. 嘗試從 JSON 文件載入
         if os.path.exists(CONFIG_FILE):
             try:
-                with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
+                with open(CONFIG_FILE, 'rb') as f:
+                    config = json_loads(f.read())
                 
                 # 載入飛書憑證
                 if 'feishu_credentials' in config:
@@ -1165,7 +2034,7 @@ class WebhookRelayManager:
                             enabled=wh_preset.get('enabled', True),
                             is_fixed=wh_preset.get('is_fixed', False)
                         )
-                        group.webhooks.append(webhook)
+                        group.append_webhook(webhook)
                 
                 self.groups[group_id] = group
                 logger.info(f"  {group_id} -> {preset.get('display_name')} ({len(group.webhooks)} webhooks)")
@@ -1173,39 +2042,84 @@ class WebhookRelayManager:
             self._save_config_sync()
     
     def _schedule_save(self):
-        """排程保存（防抖動，延遲2秒）"""
-        with self._save_lock:
-            if self._save_timer:
-                self._save_timer.cancel()
-            self._save_timer = threading.Timer(2.0, self._save_config_sync)
-            self._save_timer.start()
+        """排程保存（交由背景寫入器合併後寫入）"""
+        self.version += 1
+        self.config_writer.mark_dirty()
+    
+    def _shutdown(self):
+        """程式結束：停止背景寫入器後保存最後狀態"""
+        self.config_writer.stop()
+        self._save_config_sync()
     
     def _save_config_sync(self):
         """同步保存配置到 JSON 文件"""
+        with self._save_lock:
+            version = self.state_version()
+            if self._write_config():
+                self._saved_version = version
+    
+    def save_if_changed(self) -> bool:
+        """狀態自上次寫入後有變更才保存，回傳是否實際寫入"""
+        if self.state_version() == self._saved_version:
+            return False
+        self._save_config_sync()
+        return True
+    
+    def _stats_save_loop(self):
+        """
+        定期保存發送統計與輪詢位置
+        
+        中繼訊息只更新記憶體中的計數，不會觸發保存；
+        每 STATS_SAVE_SECONDS 秒檢查一次，有變更才交給背景寫入器
+        """
+        while True:
+            time.sleep(STATS_SAVE_SECONDS)
+            if self.state_version() != self._saved_version:
+                self.config_writer.mark_dirty()
+    
+    def _write_config(self) -> bool:
+        """
+        寫入配置文件（呼叫前需持有 _save_lock），回傳是否成功
+        
+        內容與上次寫入相同時（例如切換後又切回）略過寫檔
+        """
         try:
+            credentials = {
+                "app_id": self.feishu_app_id,
+                "app_secret": self.feishu_app_secret
+            }
+            with self.lock:
+                groups = {group_id: group.to_save_dict() for group_id, group in self.groups.items()}
+            
+            # updated_at 每次都不同，不列入比對
+            digest = hashlib.blake2b(json_dumps_bytes([credentials, groups]), digest_size=16).digest()
+            if digest == self._saved_digest:
+                return True
+            
             config = {
                 "version": "4.5",
                 "updated_at": get_local_time_str(),
-                "feishu_credentials": {
-                    "app_id": self.feishu_app_id,
-                    "app_secret": self.feishu_app_secret
-                },
-                "groups": {}
+                "feishu_credentials": credentials,
+                "groups": groups
             }
             
-            with self.lock:
-                for group_id, group in self.groups.items():
-                    config["groups"][group_id] = group.to_save_dict()
-            
-            # 使用臨時文件 + 原子替換，避免寫入中斷導致資料損壞
+            # 先在記憶體中完成序列化，再以臨時文件 + 原子替換一次寫入，
+            # 序列化失敗不會留下寫到一半的臨時文件
+            data = json_dumps_pretty(config)
             temp_file = CONFIG_FILE + ".tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
+            with open(temp_file, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())  # 確保內容落盤後才替換，斷電不會留下空文件
             os.replace(temp_file, CONFIG_FILE)
+            _fsync_dir(os.path.dirname(os.path.abspath(CONFIG_FILE)))
             
+            self._saved_digest = digest
             logger.info(f"配置已保存到 {CONFIG_FILE}")
+            return True
         except Exception as e:
             logger.error(f"保存配置失敗: {e}")
+            return False
     
     # ---- 飛書憑證管理 ----
     
@@ -1223,7 +2137,6 @@ class WebhookRelayManager:
         FEISHU_APP_ID = self.feishu_app_id
         FEISHU_APP_SECRET = self.feishu_app_secret
         feishu_uploader.set_credentials(self.feishu_app_id, self.feishu_app_secret)
-        feishu_uploader.token_cache = {'token': None, 'expire_time': 0}
         
         self._schedule_save()
         logger.info(f"飛書憑證已更新: {app_id[:10]}...")
@@ -1243,62 +2156,130 @@ class WebhookRelayManager:
     
     def create_group(self, group_id: str, display_name: str = None) -> 'BossGroup':
         """建立新群組"""
+        clean_id = normalize_group_id(group_id)
         with self.lock:
-            clean_id = re.sub(r'[^a-zA-Z0-9_]', '', group_id.lower()) or "default"
-            
-            if clean_id not in self.groups:
-                group = BossGroup(clean_id, display_name)
-                group.set_save_callback(self._schedule_save)
-                self.groups[clean_id] = group
-                logger.info(f"建立群組: {clean_id}")
-                self._schedule_save()
-            
-            return self.groups[clean_id]
+            return self._create_group_locked(clean_id, display_name)
+    
+    def _create_group_locked(self, clean_id: str, display_name: str = None) -> 'BossGroup':
+        """群組不存在時建立（呼叫前需持有 lock）"""
+        if clean_id not in self.groups:
+            group = BossGroup(clean_id, display_name)
+            group.set_save_callback(self._schedule_save)
+            self.groups[clean_id] = group
+            logger.info(f"建立群組: {clean_id}")
+            self._schedule_save()
+        
+        return self.groups[clean_id]
     
     def get_group(self, group_id: str):
-        """獲取群組"""
-        return self.groups.get(group_id.lower())
+        """獲取群組（ID 與建立時相同方式正規化，含特殊字元的 ID 也能直接命中）"""
+        return self.groups.get(normalize_group_id(group_id))
     
     def get_or_create_group(self, group_id: str):
-        """獲取或自動建立群組"""
-        return self.get_group(group_id) or self.create_group(group_id)
+        """
+        獲取或自動建立群組（/webhook 使用）
+        
+        未知群組受 MAX_AUTO_GROUPS 與 AUTO_GROUPS_PER_MINUTE 限制，超過時回傳 None，
+        避免對隨機路徑灌訊息時不斷建立新群組（每個新群組都有滿的令牌桶）
+        """
+        group = self.get_group(group_id)
+        if group is not None:
+            return group
+        clean_id = normalize_group_id(group_id)
+        with self.lock:
+            if clean_id not in self.groups and not self._allow_auto_group():
+                logger.warning("拒絕自動建立群組: %s", clean_id)
+                return None
+            return self._create_group_locked(clean_id)
+    
+    def _allow_auto_group(self) -> bool:
+        """是否允許再自動建立一個群組（呼叫前需持有 lock）"""
+        if MAX_AUTO_GROUPS > 0 and len(self.groups) >= MAX_AUTO_GROUPS:
+            return False
+        if AUTO_GROUPS_PER_MINUTE <= 0:
+            return True
+        now = time.monotonic()
+        self._auto_group_tokens = min(AUTO_GROUPS_PER_MINUTE, self._auto_group_tokens
+                                      + (now - self._auto_group_at) * AUTO_GROUPS_PER_MINUTE / 60)
+        self._auto_group_at = now
+        if self._auto_group_tokens < 1:
+            return False
+        self._auto_group_tokens -= 1
+        return True
     
     def delete_group(self, group_id: str) -> bool:
         """刪除群組"""
+        clean_id = normalize_group_id(group_id)
         with self.lock:
-            if group_id.lower() in self.groups:
-                del self.groups[group_id.lower()]
-                logger.info(f"刪除群組: {group_id}")
+            if clean_id in self.groups:
+                del self.groups[clean_id]
+                logger.info(f"刪除群組: {clean_id}")
                 self._schedule_save()
                 return True
             return False
     
-    def get_all_stats(self) -> dict:
-        """獲取所有統計資訊"""
-        uptime = get_local_time() - self.start_time
-        hours, remainder = divmod(int(uptime.total_seconds()), 3600)
+    def get_all_stats(self, include_webhooks: bool = True) -> dict:
+        """獲取所有統計資訊（整份快照只取一次時間，單次遍歷累計總數）"""
+        # 版本在讀取前取得：讀取期間若有變更，推送的版本會較新，前端會再載入一次
+        version = self.state_tag()
+        now = get_local_time()
+        uptime_seconds = int((now - self.start_time).total_seconds())
+        hours, remainder = divmod(uptime_seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
         
-        total_received = sum(g.stats["received"] for g in self.groups.values())
-        total_sent = sum(g.stats["total_sent"] for g in self.groups.values())
-        total_failed = sum(g.stats["total_failed"] for g in self.groups.values())
+        # 總數由各群組的統計結果累加，頂部總數與群組明細取自同一次讀取
+        group_stats = []
+        total_received = total_sent = total_failed = 0
+        for g in list(self.groups.values()):
+            s = g.get_stats(now, include_webhooks)
+            group_stats.append(s)
+            total_received += s["received"]
+            total_sent += s["total_sent"]
+            total_failed += s["total_failed"]
         
         return {
+            "version": version,
             "uptime": f"{hours}h {minutes}m {seconds}s",
-            "total_groups": len(self.groups),
+            "uptime_seconds": uptime_seconds,
+            "total_groups": len(group_stats),
             "total_received": total_received,
             "total_sent": total_sent,
             "total_failed": total_failed,
             "success_rate": f"{(total_sent / max(1, total_received) * 100):.1f}%",
             "config_file": CONFIG_FILE,
             "timezone": f"UTC{'+' if TIMEZONE_OFFSET >= 0 else ''}{TIMEZONE_OFFSET}",
-            "current_time": get_local_time_str(),
-            "groups": [g.get_stats() for g in self.groups.values()]
+            "current_time": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "groups": group_stats
         }
     
-    def force_save(self):
-        """強制立即保存"""
-        self._save_config_sync()
+    def state_version(self) -> tuple:
+        """目前狀態的版本（管理器版本 + 各群組版本），任何修改或中繼後都會改變"""
+        return self.version, tuple(g.version for g in list(self.groups.values()))
+    
+    def state_tag(self) -> str:
+        """
+        狀態版本的短字串（供推送事件與 /api/stats 回應比對）
+        
+        群組增刪會遞增管理器版本，各群組版本只增不減，因此版本號加總即可區分每次變更
+        """
+        return f"{self.version}.{sum(g.version for g in list(self.groups.values()))}"
+    
+    def get_all_stats_json(self, include_webhooks: bool = True) -> bytes:
+        """
+        獲取已序列化的統計資訊（供 /api/stats 使用）
+        
+        以「管理器版本 + 各群組版本 + 當前秒數」為快取鍵，
+        狀態未變時多個瀏覽器輪詢會直接重用同一份 bytes；
+        完整版與精簡版（不含 Webhook 明細）分別快取
+        """
+        key = (self.state_version(), int(time.time()))
+        cached_key, cached_body = self._stats_cache.get(include_webhooks, (None, None))
+        if cached_key == key:
+            return cached_body
+        
+        body = json_dumps_bytes(self.get_all_stats(include_webhooks))
+        self._stats_cache[include_webhooks] = (key, body)
+        return body
 
 
 # 建立全域管理器
@@ -1309,9 +2290,12 @@ manager = WebhookRelayManager()
 # 密碼驗證
 # ================================================================================
 
+ADMIN_PASSWORD_BYTES = ADMIN_PASSWORD.encode('utf-8')
+
+
 def check_auth(username, password):
-    """驗證密碼"""
-    return password == ADMIN_PASSWORD
+    """驗證密碼（固定時間比較，避免時序攻擊）"""
+    return hmac.compare_digest((password or '').encode('utf-8'), ADMIN_PASSWORD_BYTES)
 
 
 def authenticate():
@@ -1342,84 +2326,191 @@ def requires_auth(f):
 @app.route('/')
 @requires_auth
 def index():
-    """管理介面首頁"""
-    return render_template_string(HTML_TEMPLATE)
+    """管理介面首頁（支援 gzip 時回傳預先壓縮的版本）"""
+    assets = get_dashboard()
+    response = compressed_response(assets['dashboard.html'], 'text/html')
+    response.headers['Link'] = _preload_header(tuple(assets))
+    response.headers['Cache-Control'] = 'private, no-cache'  # 每次都向伺服器驗證 ETag
+    return response
+
+
+@app.route('/assets/<name>')
+@requires_auth
+def dashboard_asset(name):
+    """管理介面靜態資源（檔名含內容雜湊，可長期快取）"""
+    asset = get_dashboard().get(name)
+    if asset is None:
+        return jsonify({"error": "找不到資源"}), 404
+    mimetype = ASSET_MIMETYPES.get(os.path.splitext(name)[1], 'application/octet-stream')
+    response = compressed_response(asset, mimetype)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
 
 
 @app.route('/test-feishu')
 def test_feishu():
     results = {}
     try:
-        r = requests.post(
+        r = http_session.post(
             'https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal',
-            json={'app_id': FEISHU_APP_ID, 'app_secret': FEISHU_APP_SECRET},
-            timeout=8
+            data=json_dumps_bytes({'app_id': FEISHU_APP_ID, 'app_secret': FEISHU_APP_SECRET}),
+            headers=JSON_HEADERS,
+            timeout=(HTTP_CONNECT_TIMEOUT, 8)
         )
         results['feishu_cn'] = {"status": r.status_code, "body": r.json()}
     except Exception as e:
         results['feishu_cn'] = f"FAIL - {str(e)}"
     
     try:
-        r = requests.post(
+        r = http_session.post(
             'https://open.larksuite.com/open-apis/auth/v3/tenant_access_token/internal',
-            json={'app_id': FEISHU_APP_ID, 'app_secret': FEISHU_APP_SECRET},
-            timeout=8
+            data=json_dumps_bytes({'app_id': FEISHU_APP_ID, 'app_secret': FEISHU_APP_SECRET}),
+            headers=JSON_HEADERS,
+            timeout=(HTTP_CONNECT_TIMEOUT, 8)
         )
         results['lark_com'] = {"status": r.status_code, "body": r.json()}
     except Exception as e:
         results['lark_com'] = f"FAIL - {str(e)}"
     
     return jsonify(results)
+
+
+def is_http_url(url: str) -> bool:
+    """檢查是否為有主機名稱的 http(s) 網址"""
+    parsed = urlparse(url)
+    return parsed.scheme in ('http', 'https') and bool(parsed.netloc)
+
+
+def read_image_limited(stream) -> bytes:
+    """從串流讀取圖片，最多讀 MAX_IMAGE_BYTES + 1 位元組，超過上限回傳 None"""
+    data = stream.read(MAX_IMAGE_BYTES + 1)
+    if len(data) > MAX_IMAGE_BYTES:
+        return None
+    return data
+
+
+def download_image(image_url: str) -> bytes:
+    """
+    下載遠端圖片（失敗、超過 MAX_IMAGE_BYTES 或超過 IMAGE_DOWNLOAD_SECONDS 時回傳 None）
     
+    以 read1 逐次讀取目前已到達的資料並檢查總時限，緩慢逐位元組回應的伺服器
+    最多只能佔住下載執行緒「總時限 + 一次讀取逾時」
+    """
+    deadline = time.monotonic() + IMAGE_DOWNLOAD_SECONDS
+    try:
+        with http_session.get(image_url, timeout=(HTTP_CONNECT_TIMEOUT, min(10, IMAGE_DOWNLOAD_SECONDS)),
+                              stream=True) as resp:
+            if resp.status_code != 200:
+                return None
+            raw = resp.raw
+            if hasattr(raw, 'read1'):  # urllib3 2.x
+                chunks = iter(lambda: raw.read1(64 * 1024, decode_content=True), b'')
+            else:
+                chunks = resp.iter_content(64 * 1024)
+            data = []
+            size = 0
+            for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES or time.monotonic() > deadline:
+                    return None
+                data.append(chunk)
+            return b''.join(data)
+    except Exception:
+        return None
+
+
 @app.route('/webhook/<group_id>', methods=['POST'])
 def receive_webhook(group_id):
-    """接收外部 Webhook 並中繼轉發"""
+    """接收外部 Webhook 並中繼轉發（預設入列後回傳 202，?sync=1 時等待發送結果）"""
     try:
+        # X-Forwarded-For 可能是代理鏈，只取第一段（客戶端位址）
         source_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
-        if ',' in source_ip:
-            source_ip = source_ip.split(',')[0].strip()
+        comma = source_ip.find(',')
+        if comma >= 0:
+            source_ip = source_ip[:comma].strip()
         
-        group = manager.get_or_create_group(group_id)
         content = ""
         image_data = None
+        remote_image_url = None  # 遠端附件：由背景中繼執行緒下載，請求不等待 CDN
         
         if request.is_json:
-            data = request.get_json()
-            content = data.get('content', '')
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                data = {}
+            content = data.get('content') or ''
+            attachments = data.get('attachments') or []
+            # 型別不符時在建立群組之前就拒絕
+            if not isinstance(content, str) or not isinstance(attachments, list):
+                return json_response(ERR_BAD_PAYLOAD, 400)
+            image_url = ''
+            if attachments and isinstance(attachments[0], dict):
+                image_url = attachments[0].get('url') or ''
+                if not isinstance(image_url, str):
+                    return json_response(ERR_BAD_PAYLOAD, 400)
+            
+            # 沒有內容也沒有附件時直接拒絕，不做任何讀檔或下載
+            if not content and not image_url:
+                return json_response(ERR_NO_CONTENT, 400)
             
             # 處理附件（支援本地路徑和 URL）
-            attachments = data.get('attachments', [])
-            if attachments:
-                image_url = attachments[0].get('url', '')
-                if image_url:
-                    if os.path.exists(image_url):
+            if image_url:
+                if is_http_url(image_url):
+                    remote_image_url = image_url
+                else:
+                    # 本地路徑直接嘗試開啟（不先檢查是否存在，省一次 stat 也避免檢查後檔案被換掉）
+                    try:
                         with open(image_url, 'rb') as f:
-                            image_data = f.read()
-                    elif image_url.startswith(('http://', 'https://')):
-                        try:
-                            resp = requests.get(image_url, timeout=30)
-                            if resp.status_code == 200:
-                                image_data = resp.content
-                        except Exception:
-                            pass
+                            image_data = read_image_limited(f)
+                    except OSError:
+                        pass
+                    if image_data is None:
+                        logger.warning(f"[{group_id}] 附件讀取失敗或超過 {MAX_IMAGE_BYTES // 1024 // 1024}MB: {image_url[:80]}")
         else:
             content = request.form.get('content', '')
+            if not content and 'file' not in request.files:
+                return json_response(ERR_NO_CONTENT, 400)
             if 'file' in request.files:
-                image_data = request.files['file'].read()
+                image_data = read_image_limited(request.files['file'].stream)
+                if image_data is None:
+                    return json_response(ERR_IMAGE_TOO_LARGE, 413)
         
-        if not content and not image_data:
-            return jsonify({"success": False, "message": "無內容"}), 400
+        if not content and not image_data and not remote_image_url:
+            return json_response(ERR_NO_CONTENT, 400)
         
-        logger.info(f"[{group_id}] 收到: {content[:50]}...")
-        success, message, details = group.relay_message(content, image_data, source_ip)
+        group = manager.get_or_create_group(group_id)
+        if group is None:
+            return json_response(ERR_GROUP_LIMIT, 429)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] 收到: %s...", group_id, content[:50])
+        if not group.allow_message():
+            return json_response(ERR_RATE_LIMITED, 429)
+        
+        # ?sync=1：需要逐一端點結果的呼叫端，直接在請求中發送（不經佇列與合併）
+        if request.args.get('sync') == '1':
+            if remote_image_url:
+                image_data = download_image(remote_image_url)
+                if image_data is None:
+                    logger.warning(f"[{group_id}] 附件讀取失敗或超過 {MAX_IMAGE_BYTES // 1024 // 1024}MB: {remote_image_url[:80]}")
+                    if not content:
+                        return json_response(ERR_NO_CONTENT, 400)
+            success, message, details = group.relay_message(content, image_data, source_ip)
+            return jsonify({
+                "success": success,
+                "message": message,
+                "group_id": group_id,
+                "mode": group.send_mode,
+                "details": details
+            })
+        
+        if not group.enqueue_message(content, image_data, source_ip, remote_image_url):
+            return json_response(ERR_QUEUE_FULL, 503)
         
         return jsonify({
-            "success": success,
-            "message": message,
+            "success": True,
+            "message": "已加入發送佇列",
             "group_id": group_id,
-            "mode": group.send_mode,
-            "details": details
-        })
+            "mode": group.send_mode
+        }), 202
     except Exception as e:
         logger.error(f"[{group_id}] 錯誤: {e}")
         return jsonify({"success": False, "message": str(e)}), 500
@@ -1434,8 +2525,57 @@ def receive_webhook_default():
 @app.route('/api/stats')
 @requires_auth
 def get_stats():
-    """獲取所有統計資訊"""
-    return jsonify(manager.get_all_stats())
+    """獲取所有統計資訊（?summary=1 時不含各群組的 Webhook 與歷史明細）"""
+    summary = request.args.get('summary') == '1'
+    return json_response(manager.get_all_stats_json(include_webhooks=not summary))
+
+
+# 推送連線會佔住一個工作執行緒，限制同時連線數與單次連線時長（到期後瀏覽器自動重連）；
+# 客戶端斷線要等下一次寫入失敗才會發現，因此定期送出註解行並讓連線在一分鐘後結束
+EVENTS_MAX_STREAMS = 4
+EVENTS_STREAM_SECONDS = 60
+EVENTS_KEEPALIVE_SECONDS = 15
+_events_slots = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+@app.route('/api/events')
+@requires_auth
+def stats_events():
+    """
+    狀態變更推送（Server-Sent Events）
+    
+    每秒比對一次狀態版本，有變更才送出事件（事件內容與 id 為 state_tag），
+    管理介面只在版本與目前畫面不同時才重取 /api/stats；
+    重新連線時瀏覽器帶上 Last-Event-ID，版本未變就不送事件。
+    連線數已滿時回傳 503，前端改回定時輪詢
+    """
+    if not _events_slots.acquire(blocking=False):
+        return json_response(ERR_TOO_MANY_STREAMS, 503)
+    last_event_id = request.headers.get('Last-Event-ID')
+    
+    def stream():
+        yield 'retry: 3000\n\n'
+        last_version = last_event_id
+        last_sent = time.monotonic()
+        deadline = last_sent + EVENTS_STREAM_SECONDS
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            version = manager.state_tag()
+            if version != last_version:
+                last_version, last_sent = version, now
+                yield f'id: {version}\ndata: {version}\n\n'
+            elif now - last_sent >= EVENTS_KEEPALIVE_SECONDS:
+                last_sent = now
+                yield ': keepalive\n\n'
+            time.sleep(1)
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # 反向代理不要緩衝
+    response.call_on_close(_events_slots.release)
+    return response
 
 
 @app.route('/api/feishu/credentials', methods=['GET'])
@@ -1464,9 +2604,9 @@ def create_group():
     data = request.get_json()
     group_id = data.get('group_id', '').strip()
     if not group_id:
-        return jsonify({"success": False, "message": "請提供群組 ID"})
+        return json_response(ERR_NO_GROUP_ID)
     if manager.get_group(group_id):
-        return jsonify({"success": False, "message": "此群組 ID 已存在"})
+        return json_response(ERR_GROUP_EXISTS)
     manager.create_group(group_id, data.get('display_name'))
     return jsonify({"success": True, "message": "建立成功"})
 
@@ -1484,7 +2624,7 @@ def set_group_mode(group_id):
     """切換群組發送模式"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     success, message = group.set_send_mode(request.get_json().get('mode', ''))
     return jsonify({"success": success, "message": message})
 
@@ -1495,7 +2635,7 @@ def add_webhook_to_group(group_id):
     """添加 Webhook 到群組"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     data = request.get_json()
     success, message = group.add_webhook(
         data.get('url', '').strip(),
@@ -1512,7 +2652,7 @@ def remove_webhook_from_group(group_id, webhook_id):
     """從群組移除 Webhook"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     return jsonify({"success": group.remove_webhook(webhook_id)})
 
 
@@ -1522,7 +2662,7 @@ def update_webhook(group_id, webhook_id):
     """更新 Webhook 名稱"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     success, message = group.update_webhook(webhook_id, request.get_json().get('name'))
     return jsonify({"success": success, "message": message})
 
@@ -1533,7 +2673,7 @@ def toggle_webhook(group_id, webhook_id):
     """啟用/禁用 Webhook"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     success, message = group.toggle_webhook(webhook_id, request.get_json().get('enabled', True))
     return jsonify({"success": success, "message": message})
 
@@ -1544,11 +2684,69 @@ def toggle_webhook_fixed(group_id, webhook_id):
     """切換 Webhook 固定狀態"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     success, message = group.toggle_webhook_fixed(webhook_id, request.get_json().get('is_fixed', False))
     return jsonify({"success": success, "message": message})
 
 
+def _apply_batch_op(op: dict) -> dict:
+    """套用單一批次操作，回傳 {"success", "message"}"""
+    if not isinstance(op, dict):
+        return {"success": False, "message": "無效的操作"}
+    group_id = op.get('group_id', '')
+    webhook_id = op.get('webhook_id', '')
+    if not isinstance(group_id, str) or not isinstance(webhook_id, str):
+        return {"success": False, "message": "無效的操作"}
+    group = manager.get_group(group_id)
+    if not group:
+        return {"success": False, "message": "群組不存在"}
+    
+    action = op.get('op')
+    if action == 'toggle':
+        success, message = group.toggle_webhook(webhook_id, op.get('enabled', True))
+    elif action == 'fixed':
+        success, message = group.toggle_webhook_fixed(webhook_id, op.get('is_fixed', False))
+    elif action == 'rename':
+        name = op.get('name')
+        if not isinstance(name, str):
+            return {"success": False, "message": "無效的名稱"}
+        success, message = group.update_webhook(webhook_id, name)
+    elif action == 'remove':
+        success = group.remove_webhook(webhook_id)
+        message = "已移除" if success else "找不到此 Webhook"
+    else:
+        success, message = False, f"不支援的操作: {action}"
+    return {"success": success, "message": message}
+
+
+@app.route('/api/batch', methods=['POST'])
+@requires_auth
+def apply_batch():
+    """
+    批次套用多個 Webhook 操作（管理介面連續操作合併為一次請求）
+    
+    請求格式：
+    [
+        {"op": "toggle", "group_id": "...", "webhook_id": "...", "enabled": true},
+        {"op": "fixed", "group_id": "...", "webhook_id": "...", "is_fixed": false},
+        {"op": "rename", "group_id": "...", "webhook_id": "...", "name": "..."},
+        {"op": "remove", "group_id": "...", "webhook_id": "..."}
+    ]
+    依序執行並逐筆回傳結果；配置變更由背景寫入器合併為一次寫入
+    """
+    ops = request.get_json(silent=True)
+    if not isinstance(ops, list):
+        return json_response(ERR_BAD_BATCH)
+    results = [_apply_batch_op(op) for op in ops]
+    return jsonify({"success": all(r["success"] for r in results), "results": results})
+
+
+# 排程欄位格式（比對以字串進行，且會原樣顯示在管理介面，格式不符的項目一律捨棄）
+_SCHEDULE_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+_SCHEDULE_TIME = re.compile(r'([01]\d|2[0-3]):[0-5]\d')
+_SCHEDULE_MODES = ('off', 'date_range')
+
+
 @app.route('/api/group/<group_id>/webhook/<webhook_id>/schedule', methods=['POST'])
 @requires_auth
 def set_webhook_schedule(group_id, webhook_id):
@@ -1566,36 +2764,33 @@ def set_webhook_schedule(group_id, webhook_id):
     """
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
-    
-    webhook = next((wh for wh in group.webhooks if wh.id == webhook_id), None)
-    if not webhook:
-        return jsonify({"success": False, "message": "找不到此 Webhook"})
+        return json_response(ERR_NO_GROUP)
     
     data = request.get_json()
-    webhook.schedule_mode = data.get('schedule_mode', 'off')
+    schedule_mode = data.get('schedule_mode', 'off')
+    if schedule_mode not in _SCHEDULE_MODES:
+        return json_response(ERR_BAD_SCHEDULE_MODE, 400)
     
-    # 驗證並儲存排程列表
+    # 驗證排程列表（未提供時保留原有時段）
+    valid_schedules = None
     if 'schedules' in data:
+        if not isinstance(data['schedules'], list):
+            return json_response(ERR_BAD_SCHEDULES, 400)
         valid_schedules = []
         for s in data['schedules']:
-            if s.get('date') and s.get('start_time') and s.get('end_time'):
+            if (isinstance(s, dict)
+                    and _SCHEDULE_DATE.fullmatch(str(s.get('date', '')))
+                    and _SCHEDULE_TIME.fullmatch(str(s.get('start_time', '')))
+                    and _SCHEDULE_TIME.fullmatch(str(s.get('end_time', '')))):
                 valid_schedules.append({
                     "date": s["date"],
                     "start_time": s["start_time"],
                     "end_time": s["end_time"]
                 })
-        webhook.schedules = valid_schedules
-    
-    manager.force_save()
     
-    schedule_count = len(webhook.schedules)
-    if webhook.schedule_mode != 'off':
-        message = f"{webhook.name} 排程已更新 ({schedule_count} 筆)"
-    else:
-        message = f"{webhook.name} 排程已關閉"
-    
-    return jsonify({"success": True, "message": message})
+    # 交由背景寫入器合併保存，不在請求中同步寫檔
+    success, message = group.set_webhook_schedule(webhook_id, schedule_mode, valid_schedules)
+    return jsonify({"success": success, "message": message})
 
 
 @app.route('/api/group/<group_id>/webhook/<webhook_id>/test', methods=['POST'])
@@ -1604,11 +2799,11 @@ def test_single_webhook(group_id, webhook_id):
     """測試單個 Webhook"""
     group = manager.get_group(group_id)
     if not group:
-        return jsonify({"success": False, "message": "群組不存在"})
+        return json_response(ERR_NO_GROUP)
     
-    webhook = next((wh for wh in group.webhooks if wh.id == webhook_id), None)
+    webhook = group.get_webhook(webhook_id)
     if not webhook:
-        return jsonify({"success": False, "message": "找不到此 Webhook"})
+        return json_response(ERR_NO_WEBHOOK)
     
     data = request.get_json()
     content = data.get('content', f'[測試] {webhook.name}')
@@ -1622,10 +2817,7 @@ def test_single_webhook(group_id, webhook_id):
     sender = sender_map.get(webhook.webhook_type)
     success = sender(webhook.url, content) if sender else False
     
-    if success:
-        webhook.stats["sent"] += 1
-    else:
-        webhook.stats["failed"] += 1
+    group._record_send(webhook, success)
     
     return jsonify({"success": success, "message": "發送成功" if success else "發送失敗"})
 
@@ -1633,9 +2825,9 @@ def test_single_webhook(group_id, webhook_id):
 @app.route('/api/save', methods=['POST'])
 @requires_auth
 def force_save():
-    """強制保存配置"""
-    manager.force_save()
-    return jsonify({"success": True, "message": "已保存"})
+    """保存配置（自上次寫入後沒有變更時略過）"""
+    saved = manager.save_if_changed()
+    return jsonify({"success": True, "message": "已保存" if saved else "配置未變更"})
 
 
 @app.route('/health')
@@ -1650,703 +2842,127 @@ def health():
 
 
 # ================================================================================
-# HTML 模板 - v4.5 日期時段排程版
+# 管理介面模板（templates/，啟動時載入並預先壓縮）
 # ================================================================================
 
-HTML_TEMPLATE = '''
-<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Webhook 中繼站 v4.5</title>
-    <style>
-        :root {
-            --bg-primary: #0e1117;
-            --bg-secondary: #161b22;
-            --bg-tertiary: #1c2129;
-            --bg-card: rgba(22, 27, 34, 0.8);
-            --border: rgba(48, 54, 61, 0.8);
-            --border-light: rgba(48, 54, 61, 0.4);
-            --text-primary: #e6edf3;
-            --text-secondary: #8b949e;
-            --text-muted: #6e7681;
-            --accent: #58a6ff;
-            --success: #3fb950;
-            --danger: #f85149;
-            --warning: #d29922;
-            --purple: #bc8cff;
-            --pink: #f778ba;
-        }
-        
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', 'Microsoft JhengHei', sans-serif;
-            background: var(--bg-primary);
-            min-height: 100vh;
-            color: var(--text-primary);
-            padding: 16px;
-            line-height: 1.5;
-        }
-        
-        .container { max-width: 1000px; margin: 0 auto; }
-        h1 { text-align: center; margin-bottom: 4px; font-size: 1.5em; font-weight: 600; }
-        .subtitle { text-align: center; color: var(--text-secondary); margin-bottom: 6px; font-size: 0.82em; }
-        .config-info { text-align: center; font-size: 0.75em; color: var(--text-muted); margin-bottom: 20px; }
-        
-        .card { background: var(--bg-card); border-radius: 8px; padding: 16px; margin-bottom: 12px; border: 1px solid var(--border); }
-        .card h2 { color: var(--text-primary); margin-bottom: 12px; font-size: 0.95em; font-weight: 600; }
-        
-        .stats-grid { display: grid; grid-template-columns: repeat(auto-fit, minmax(90px, 1fr)); gap: 8px; }
-        .stat-box { background: var(--bg-tertiary); border-radius: 6px; padding: 10px 8px; text-align: center; border: 1px solid var(--border-light); }
-        .stat-box .value { font-size: 1.4em; font-weight: 700; color: var(--accent); }
-        .stat-box .label { font-size: 0.7em; color: var(--text-muted); margin-top: 2px; }
-        
-        .group-card { background: var(--bg-secondary); border: 1px solid var(--border); border-radius: 8px; margin-bottom: 10px; overflow: hidden; }
-        .group-header { background: var(--bg-tertiary); padding: 10px 14px; display: flex; justify-content: space-between; align-items: center; cursor: pointer; flex-wrap: wrap; gap: 8px; transition: background 0.15s; }
-        .group-header:hover { background: rgba(56, 62, 71, 0.6); }
-        .group-title { font-weight: 600; font-size: 0.95em; display: flex; align-items: center; gap: 8px; flex-wrap: wrap; }
-        .group-title .id { font-family: monospace; background: rgba(110, 118, 129, 0.2); padding: 1px 7px; border-radius: 4px; font-size: 0.82em; color: var(--text-secondary); }
-        .group-stats-mini { display: flex; gap: 10px; font-size: 0.78em; color: var(--text-secondary); flex-wrap: wrap; }
-        .group-body { padding: 14px; display: none; border-top: 1px solid var(--border-light); }
-        .group-body.open { display: block; }
-        
-        .mode-selector { display: flex; gap: 8px; margin: 8px 0; flex-wrap: wrap; }
-        .mode-btn { padding: 6px 14px; border-radius: 6px; border: 1px solid var(--border); background: transparent; color: var(--text-secondary); cursor: pointer; font-size: 0.82em; transition: all 0.15s; }
-        .mode-btn:hover { border-color: var(--accent); color: var(--accent); }
-        .mode-btn.active { background: rgba(88, 166, 255, 0.15); border-color: var(--accent); color: var(--accent); }
-        .mode-btn.active-rr { background: rgba(188, 140, 255, 0.15); border-color: var(--purple); color: var(--purple); }
-        
-        .mode-info { background: rgba(88, 166, 255, 0.08); border: 1px solid rgba(88, 166, 255, 0.2); border-radius: 6px; padding: 8px 10px; font-size: 0.78em; margin: 8px 0; color: var(--text-secondary); }
-        .mode-info.round_robin { background: rgba(188, 140, 255, 0.08); border-color: rgba(188, 140, 255, 0.2); }
-        
-        .endpoint-box { background: var(--bg-tertiary); border: 1px solid var(--border-light); border-radius: 6px; padding: 8px 10px; font-family: monospace; font-size: 0.8em; margin: 8px 0; display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 6px; color: var(--success); }
-        
-        .webhook-item { background: var(--bg-tertiary); border-radius: 6px; padding: 10px 12px; margin-bottom: 6px; border: 1px solid var(--border-light); transition: all 0.15s; }
-        .webhook-item.disabled { opacity: 0.45; }
-        .webhook-item.next { border-left: 3px solid var(--success); }
-        .webhook-item.fixed { border-left: 3px solid var(--purple); }
-        .webhook-item.schedule-off { border-left: 3px solid var(--warning); }
-        
-        .webhook-header { display: flex; justify-content: space-between; align-items: center; margin-bottom: 6px; flex-wrap: wrap; gap: 6px; }
-        .webhook-name { font-weight: 600; font-size: 0.88em; display: flex; align-items: center; gap: 6px; flex-wrap: wrap; }
-        .webhook-url { font-family: monospace; font-size: 0.72em; color: var(--text-muted); word-break: break-all; margin-top: 3px; }
-        .webhook-stats { font-size: 0.72em; color: var(--text-muted); margin-top: 3px; }
-        .webhook-controls { display: flex; gap: 4px; align-items: center; flex-wrap: wrap; }
-        
-        .toggle-switch { position: relative; width: 40px; height: 22px; flex-shrink: 0; }
-        .toggle-switch input { opacity: 0; width: 0; height: 0; }
-        .toggle-slider { position: absolute; cursor: pointer; top: 0; left: 0; right: 0; bottom: 0; background: rgba(110, 118, 129, 0.4); transition: 0.2s; border-radius: 22px; }
-        .toggle-slider:before { position: absolute; content: ""; height: 16px; width: 16px; left: 3px; bottom: 3px; background: white; transition: 0.2s; border-radius: 50%; }
-        .toggle-switch input:checked + .toggle-slider { background: var(--success); }
-        .toggle-switch input:checked + .toggle-slider:before { transform: translateX(18px); }
-        
-        .btn { background: var(--accent); border: none; color: #fff; padding: 5px 10px; border-radius: 5px; cursor: pointer; font-size: 0.78em; transition: all 0.15s; font-weight: 500; white-space: nowrap; }
-        .btn:hover { opacity: 0.85; }
-        .btn-danger { background: var(--danger); }
-        .btn-success { background: var(--success); }
-        .btn-purple { background: var(--purple); }
-        .btn-warning { background: var(--warning); color: #000; }
-        .btn-outline { background: transparent; border: 1px solid var(--border); color: var(--text-secondary); }
-        .btn-outline:hover { border-color: var(--accent); color: var(--accent); }
-        .btn-sm { padding: 3px 7px; font-size: 0.75em; }
-        
-        input[type="text"], input[type="password"], input[type="time"], input[type="date"], select { padding: 6px 10px; border: 1px solid var(--border); border-radius: 5px; background: var(--bg-primary); color: var(--text-primary); font-size: 0.82em; }
-        input::placeholder { color: var(--text-muted); }
-        input:focus, select:focus { outline: none; border-color: var(--accent); }
-        select option { background: var(--bg-secondary); }
-        
-        .flex-row { display: flex; gap: 6px; margin-bottom: 8px; flex-wrap: wrap; align-items: center; }
-        .flex-row input { flex: 1; min-width: 140px; }
-        
-        .add-form { background: var(--bg-primary); border: 1px solid var(--border-light); border-radius: 6px; padding: 10px; margin: 8px 0; }
-        .add-form .title { font-size: 0.82em; color: var(--text-secondary); margin-bottom: 8px; font-weight: 500; }
-        
-        .history-item { background: var(--bg-primary); border-radius: 4px; padding: 6px 8px; margin-bottom: 3px; font-size: 0.75em; border: 1px solid var(--border-light); }
-        .history-item .time { color: var(--accent); font-family: monospace; font-size: 0.92em; }
-        .history-item .mode-tag { background: rgba(110, 118, 129, 0.2); padding: 1px 5px; border-radius: 3px; font-size: 0.85em; }
-        
-        .badge { display: inline-block; padding: 1px 6px; border-radius: 10px; font-size: 0.68em; font-weight: 600; }
-        .badge-discord { background: rgba(88, 101, 242, 0.2); color: #8b9bff; }
-        .badge-feishu { background: rgba(88, 166, 255, 0.15); color: var(--accent); }
-        .badge-wecom { background: rgba(7, 193, 96, 0.15); color: #3fb950; }
-        .badge-next { background: rgba(63, 185, 80, 0.15); color: var(--success); }
-        .badge-fixed { background: rgba(188, 140, 255, 0.15); color: var(--purple); }
-        .badge-img { background: rgba(247, 120, 186, 0.15); color: var(--pink); }
-        .badge-sync { background: rgba(88, 166, 255, 0.15); color: var(--accent); }
-        .badge-rr { background: rgba(188, 140, 255, 0.15); color: var(--purple); }
-        .badge-schedule { background: rgba(210, 153, 34, 0.15); color: var(--warning); }
-        .badge-schedule-on { background: rgba(63, 185, 80, 0.15); color: var(--success); }
-        
-        .copy-btn { background: transparent; border: 1px solid var(--border); color: var(--text-secondary); padding: 2px 8px; border-radius: 4px; cursor: pointer; font-size: 0.75em; }
-        .copy-btn:hover { border-color: var(--accent); color: var(--accent); }
-        
-        .section-title { font-size: 0.82em; color: var(--text-secondary); margin: 12px 0 8px; padding-bottom: 4px; border-bottom: 1px solid var(--border-light); font-weight: 500; }
-        .no-data { color: var(--text-muted); font-size: 0.78em; padding: 12px; text-align: center; background: var(--bg-primary); border-radius: 6px; border: 1px dashed var(--border-light); }
-        .save-indicator { position: fixed; bottom: 20px; right: 20px; background: var(--success); color: #000; padding: 8px 16px; border-radius: 6px; font-weight: 600; font-size: 0.85em; display: none; z-index: 1000; }
-        .feishu-ok { color: var(--success); }
-        .feishu-err { color: var(--danger); }
-        
-        /* v4.5 排程面板 */
-        .schedule-panel { background: var(--bg-primary); border: 1px solid var(--border-light); border-radius: 6px; padding: 10px; margin-top: 8px; font-size: 0.82em; }
-        .schedule-panel.active { border-color: rgba(63, 185, 80, 0.3); }
-        .schedule-row { display: flex; gap: 6px; align-items: center; padding: 4px 0; flex-wrap: wrap; border-bottom: 1px solid var(--border-light); }
-        .schedule-row:last-child { border-bottom: none; }
-        .schedule-row .date { color: var(--accent); font-family: monospace; min-width: 70px; }
-        .schedule-row .time { color: var(--text-secondary); font-family: monospace; }
-        .schedule-row.expired { opacity: 0.4; }
-        .schedule-row.today { background: rgba(63, 185, 80, 0.05); border-radius: 4px; padding: 4px 6px; }
-        .schedule-add-row { display: flex; gap: 6px; align-items: center; margin-top: 6px; flex-wrap: wrap; }
-        
-        @media (max-width: 600px) {
-            .stats-grid { grid-template-columns: repeat(2, 1fr); }
-            .group-header, .webhook-header { flex-direction: column; align-items: flex-start; }
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>Webhook 中繼站</h1>
-        <p class="subtitle">v4.5 | 運行: <span id="uptime">-</span></p>
-        <p class="config-info">配置: <span id="configFile">-</span> · 時區: <span id="timezone">-</span> · <span id="currentTime">-</span></p>
-        
-        <div class="card">
-            <h2>總覽統計</h2>
-            <div class="stats-grid">
-                <div class="stat-box"><div class="value" id="totalGroups">0</div><div class="label">群組</div></div>
-                <div class="stat-box"><div class="value" id="totalReceived">0</div><div class="label">接收</div></div>
-                <div class="stat-box"><div class="value" id="totalSent">0</div><div class="label">成功</div></div>
-                <div class="stat-box"><div class="value" id="totalFailed">0</div><div class="label">失敗</div></div>
-                <div class="stat-box"><div class="value" id="successRate">0%</div><div class="label">成功率</div></div>
-            </div>
-        </div>
-        
-        <div class="card">
-            <h2>飛書應用憑證</h2>
-            <div style="font-size:0.8em;margin-bottom:8px;color:var(--text-secondary)">修改後即時生效。狀態: <span id="feishuStatus">載入中...</span></div>
-            <div class="flex-row">
-                <input type="text" id="feishuAppId" placeholder="APP ID" style="flex:1;min-width:180px">
-                <input type="password" id="feishuAppSecret" placeholder="APP Secret" style="flex:1;min-width:180px">
-                <button class="btn btn-success" onclick="updateFeishuCredentials()">保存</button>
-                <button class="btn btn-outline btn-sm" onclick="document.getElementById('feishuAppSecret').type=document.getElementById('feishuAppSecret').type==='password'?'text':'password'">顯示</button>
-            </div>
-        </div>
-        
-        <div class="card">
-            <h2>建立新群組</h2>
-            <div class="flex-row">
-                <input type="text" id="newGroupId" placeholder="群組 ID" style="max-width:140px">
-                <input type="text" id="newGroupName" placeholder="顯示名稱">
-                <button class="btn btn-success" onclick="createGroup()">建立</button>
-            </div>
-        </div>
-        
-        <div class="card">
-            <h2>BOSS 群組管理</h2>
-            <div id="groupList"></div>
-        </div>
-        
-        <div class="card">
-            <h2>使用說明</h2>
-            <div style="font-size:0.82em;line-height:1.7;color:var(--text-secondary)">
-                <p><strong style="color:var(--text-primary)">v4.5 - 日期時段排程：</strong></p>
-                <ul style="margin-left:18px;margin-bottom:8px">
-                    <li>每個 Webhook 可設定多筆「指定日期 + 時段」排程</li>
-                    <li>例如：A 在 2/23 12:00-22:00 和 2/24 00:00-12:00 開啟通知</li>
-                    <li>不在排程內的通知自動跳過，過期排程標灰可手動清除</li>
-                </ul>
-                <p><strong style="color:var(--text-primary)">發送模式：</strong></p>
-                <ul style="margin-left:18px">
-                    <li><span class="badge badge-sync">同步</span> 同時發送到所有在排程內的 Webhook</li>
-                    <li><span class="badge badge-rr">輪詢</span> 輪流發送，跳過排程外的</li>
-                    <li><span class="badge badge-fixed">固定</span> 任何模式都會發送（仍受排程限制）</li>
-                </ul>
-            </div>
-        </div>
-    </div>
-    <div class="save-indicator" id="saveIndicator">已保存</div>
-
-    <script>
-        const baseUrl = window.location.origin;
-        let openGroups = new Set();
-        let openSchedulePanels = new Set();
-        let inputStates = {};
-        let isUserInteracting = false;
-        let lastInteractionTime = 0;
-        
-        document.addEventListener('DOMContentLoaded', function() {
-            document.body.addEventListener('mousedown', () => { isUserInteracting = true; lastInteractionTime = Date.now(); });
-            document.body.addEventListener('keydown', () => { isUserInteracting = true; lastInteractionTime = Date.now(); });
-            document.body.addEventListener('focus', (e) => {
-                if (e.target.matches('input, select, textarea')) { isUserInteracting = true; lastInteractionTime = Date.now(); }
-            }, true);
-            setInterval(() => { if (Date.now() - lastInteractionTime > 5000) isUserInteracting = false; }, 500);
-            loadFeishuCredentials();
-        });
-        
-        function showSave() {
-            const el = document.getElementById('saveIndicator');
-            el.style.display = 'block';
-            setTimeout(() => el.style.display = 'none', 2000);
-        }
-        
-        function saveInputStates() {
-            inputStates = {};
-            ['newGroupId', 'newGroupName'].forEach(id => {
-                const el = document.getElementById(id);
-                if (el) inputStates[id] = el.value;
-            });
-            document.querySelectorAll('[id^="wn-"], [id^="wu-"], [id^="sd-"], [id^="ss-"], [id^="se-"]').forEach(el => { inputStates[el.id] = el.value; });
-            document.querySelectorAll('[id^="wt-"]').forEach(el => { inputStates[el.id] = el.value; });
-            document.querySelectorAll('[id^="wf-"]').forEach(el => { inputStates[el.id] = el.checked; });
-        }
-        
-        function restoreInputStates() {
-            for (const [id, val] of Object.entries(inputStates)) {
-                const el = document.getElementById(id);
-                if (el) { el.type === 'checkbox' ? el.checked = val : el.value = val; }
-            }
-        }
-        
-        function savePanelStates() {
-            openSchedulePanels.clear();
-            document.querySelectorAll('[id^="sp-"]').forEach(box => {
-                if (box.style.display !== 'none') openSchedulePanels.add(box.id.replace('sp-', ''));
-            });
-        }
-        
-        function restorePanelStates() {
-            openSchedulePanels.forEach(id => {
-                const box = document.getElementById('sp-' + id);
-                if (box) box.style.display = 'block';
-            });
-        }
-        
-        function updateStatsOnly(data) {
-            document.getElementById('uptime').textContent = data.uptime;
-            document.getElementById('totalGroups').textContent = data.total_groups;
-            document.getElementById('totalReceived').textContent = data.total_received;
-            document.getElementById('totalSent').textContent = data.total_sent;
-            document.getElementById('totalFailed').textContent = data.total_failed;
-            document.getElementById('successRate').textContent = data.success_rate;
-            document.getElementById('configFile').textContent = data.config_file || '-';
-            document.getElementById('timezone').textContent = data.timezone || '-';
-            document.getElementById('currentTime').textContent = data.current_time || '-';
-        }
-        
-        async function loadData(forceRender = false) {
-            try {
-                const res = await fetch('/api/stats');
-                const data = await res.json();
-                if (isUserInteracting && !forceRender) { updateStatsOnly(data); return; }
-                saveInputStates();
-                savePanelStates();
-                updateStatsOnly(data);
-                renderGroups(data.groups);
-                restoreInputStates();
-                restorePanelStates();
-            } catch (e) { console.error(e); }
-        }
-        
-        async function loadFeishuCredentials() {
-            try {
-                const res = await fetch('/api/feishu/credentials');
-                const data = await res.json();
-                document.getElementById('feishuAppId').value = data.app_id || '';
-                document.getElementById('feishuAppSecret').value = data.app_secret || '';
-                document.getElementById('feishuStatus').innerHTML = data.is_configured
-                    ? '<span class="feishu-ok">已配置 (' + data.app_id_masked + ')</span>'
-                    : '<span class="feishu-err">未配置</span>';
-            } catch (e) {}
-        }
-        
-        async function updateFeishuCredentials() {
-            const appId = document.getElementById('feishuAppId').value.trim();
-            const appSecret = document.getElementById('feishuAppSecret').value.trim();
-            if (!appId || !appSecret) return alert('請填寫完整');
-            const res = await (await fetch('/api/feishu/credentials', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ app_id: appId, app_secret: appSecret })
-            })).json();
-            if (res.success) { showSave(); await loadFeishuCredentials(); alert(res.message); }
-            else alert(res.message);
-        }
-        
-        function getTodayStr() {
-            const n = new Date();
-            return n.getFullYear() + '-' + String(n.getMonth()+1).padStart(2,'0') + '-' + String(n.getDate()).padStart(2,'0');
-        }
-        
-        function formatDateShort(d) {
-            try { const dt = new Date(d + 'T00:00:00'); return (dt.getMonth()+1) + '/' + dt.getDate(); }
-            catch(e) { return d; }
-        }
-        
-        function isNextWebhook(group, webhookId) {
-            const enabled = group.webhooks.filter(w => w.enabled && !w.is_fixed);
-            if (!enabled.length) return false;
-            const idx = group.current_index % enabled.length;
-            return enabled[idx] && enabled[idx].id === webhookId;
-        }
-        
-        function toggleGroup(groupId) {
-            if (openGroups.has(groupId)) openGroups.delete(groupId);
-            else openGroups.add(groupId);
-            document.getElementById('group-' + groupId)?.classList.toggle('open');
-        }
-        
-        function toggleSchedulePanel(webhookId) {
-            const box = document.getElementById('sp-' + webhookId);
-            if (box.style.display === 'none') { box.style.display = 'block'; openSchedulePanels.add(webhookId); }
-            else { box.style.display = 'none'; openSchedulePanels.delete(webhookId); }
-        }
-        
-        function copyText(text) { navigator.clipboard.writeText(text); alert('已複製'); }
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+DASHBOARD_TEMPLATE = os.path.join(TEMPLATES_DIR, 'dashboard.html')
+DASHBOARD_SCRIPT = os.path.join(TEMPLATES_DIR, 'dashboard.js')
+DASHBOARD_STYLE = os.path.join(TEMPLATES_DIR, 'dashboard.css')
+ASSET_MIMETYPES = {'.js': 'application/javascript', '.css': 'text/css'}
+ASSET_PRELOAD_AS = {'.js': 'script', '.css': 'style'}
 
-        // ====== 渲染群組列表 ======
-        function renderGroups(groups) {
-            const container = document.getElementById('groupList');
-            if (!groups || !groups.length) {
-                container.innerHTML = '<div class="no-data">尚未建立任何群組</div>';
-                return;
-            }
-            const today = getTodayStr();
-            
-            container.innerHTML = groups.map(g => `
-                <div class="group-card">
-                    <div class="group-header" onclick="toggleGroup('${g.group_id}')">
-                        <div class="group-title">
-                            <span>${g.display_name}</span>
-                            <span class="id">${g.group_id}</span>
-                            <span class="badge ${g.send_mode === 'sync' ? 'badge-sync' : 'badge-rr'}">${g.send_mode_name}</span>
-                            ${g.webhooks_fixed > 0 ? '<span class="badge badge-fixed">固定 ' + g.webhooks_fixed + '</span>' : ''}
-                        </div>
-                        <div class="group-stats-mini">
-                            <span>接收 ${g.received}</span>
-                            <span>成功 ${g.total_sent}</span>
-                            <span>失敗 ${g.total_failed}</span>
-                            <span>啟用 ${g.webhooks_enabled}/${g.webhooks_total}</span>
-                        </div>
-                    </div>
-                    <div class="group-body ${openGroups.has(g.group_id) ? 'open' : ''}" id="group-${g.group_id}">
-                        <div class="section-title">接收端點</div>
-                        <div class="endpoint-box">
-                            <span>${baseUrl}/webhook/${g.group_id}</span>
-                            <button class="copy-btn" onclick="copyText('${baseUrl}/webhook/${g.group_id}')">複製</button>
-                        </div>
-                        
-                        <div class="section-title">發送模式</div>
-                        <div class="mode-selector">
-                            <button class="mode-btn ${g.send_mode === 'sync' ? 'active' : ''}" onclick="setMode('${g.group_id}', 'sync')">同步模式</button>
-                            <button class="mode-btn ${g.send_mode === 'round_robin' ? 'active-rr' : ''}" onclick="setMode('${g.group_id}', 'round_robin')">輪詢模式</button>
-                        </div>
-                        <div class="mode-info ${g.send_mode}">
-                            ${g.send_mode === 'sync' 
-                                ? '同步：同時發送到所有排程內的 Webhook' 
-                                : '輪詢：輪流發送，跳過排程外的'}
-                        </div>
-                        
-                        <div class="section-title">Webhook 列表 (${g.webhooks_enabled}/${g.webhooks_total})</div>
-                        <div class="add-form">
-                            <div class="title">添加新 Webhook</div>
-                            <div class="flex-row">
-                                <input type="text" id="wn-${g.group_id}" placeholder="名稱" style="max-width:110px">
-                                <select id="wt-${g.group_id}" style="max-width:95px">
-                                    <option value="discord">Discord</option>
-                                    <option value="feishu">飛書</option>
-                                    <option value="wecom">企業微信</option>
-                                </select>
-                                <input type="text" id="wu-${g.group_id}" placeholder="Webhook URL">
-                                <label style="display:flex;align-items:center;gap:3px;font-size:0.82em;color:var(--text-secondary)">
-                                    <input type="checkbox" id="wf-${g.group_id}"><span>固定</span>
-                                </label>
-                                <button class="btn btn-success btn-sm" onclick="addWebhook('${g.group_id}')">添加</button>
-                            </div>
-                        </div>
-                        
-                        ${g.webhooks && g.webhooks.length ? g.webhooks.map((w, i) => {
-                            const isNext = g.send_mode === 'round_robin' && w.enabled && !w.is_fixed && isNextWebhook(g, w.id);
-                            const scheduleOff = w.schedule_mode !== 'off' && !w.is_in_schedule;
-                            return `
-                            <div class="webhook-item ${!w.enabled ? 'disabled' : ''} ${isNext ? 'next' : ''} ${w.is_fixed ? 'fixed' : ''} ${scheduleOff ? 'schedule-off' : ''}">
-                                <div class="webhook-header">
-                                    <div class="webhook-name">
-                                        <span class="badge ${w.webhook_type === 'discord' ? 'badge-discord' : w.webhook_type === 'feishu' ? 'badge-feishu' : 'badge-wecom'}">
-                                            ${w.webhook_type === 'discord' ? 'Discord' : w.webhook_type === 'feishu' ? '飛書' : '企微'}
-                                        </span>
-                                        <span>${w.name}</span>
-                                        ${w.is_fixed ? '<span class="badge badge-fixed">固定</span>' : ''}
-                                        ${isNext ? '<span class="badge badge-next">下一個</span>' : ''}
-                                        ${w.schedule_mode !== 'off' ? (w.is_in_schedule 
-                                            ? '<span class="badge badge-schedule-on">排程中</span>' 
-                                            : '<span class="badge badge-schedule">排程外</span>') : ''}
-                                    </div>
-                                    <div class="webhook-controls">
-                                        <label class="toggle-switch">
-                                            <input type="checkbox" ${w.enabled ? 'checked' : ''} onchange="toggleWebhook('${g.group_id}', '${w.id}', this.checked)">
-                                            <span class="toggle-slider"></span>
-                                        </label>
-                                        <button class="btn ${w.is_fixed ? 'btn-purple' : 'btn-outline'} btn-sm" onclick="toggleFixed('${g.group_id}', '${w.id}', ${!w.is_fixed})">固定</button>
-                                        <button class="btn btn-warning btn-sm" onclick="toggleSchedulePanel('${w.id}')">排程</button>
-                                        <button class="btn btn-outline btn-sm" onclick="renameWebhook('${g.group_id}', '${w.id}', '${w.name.replace(/'/g, "\\'")}')">改名</button>
-                                        <button class="btn btn-outline btn-sm" onclick="testWebhook('${g.group_id}', '${w.id}')">測試</button>
-                                        <button class="btn btn-danger btn-sm" onclick="removeWebhook('${g.group_id}', '${w.id}')">刪除</button>
-                                    </div>
-                                </div>
-                                <div class="webhook-url">${w.url_preview}</div>
-                                <div class="webhook-stats">成功 ${w.sent} | 失敗 ${w.failed}${w.schedule_info ? ' | ' + w.schedule_info : ''}</div>
-                                
-                                <!-- v4.5 排程面板 -->
-                                <div class="schedule-panel ${w.schedule_mode !== 'off' ? 'active' : ''}" id="sp-${w.id}" style="display:none">
-                                    <div style="display:flex;align-items:center;gap:8px;margin-bottom:8px;flex-wrap:wrap">
-                                        <label class="toggle-switch">
-                                            <input type="checkbox" id="sm-${w.id}" ${w.schedule_mode !== 'off' ? 'checked' : ''} onchange="toggleScheduleMode('${g.group_id}', '${w.id}', this.checked)">
-                                            <span class="toggle-slider"></span>
-                                        </label>
-                                        <span>啟用日期排程</span>
-                                        ${w.schedules && w.schedules.length ? '<span style="color:var(--text-muted);font-size:0.9em">(' + w.schedules.length + ' 筆)</span>' : ''}
-                                    </div>
-                                    <div id="sl-${w.id}">
-                                        ${(w.schedules || []).map((s, si) => {
-                                            const isExpired = s.date < today;
-                                            const isToday = s.date === today;
-                                            return '<div class="schedule-row ' + (isExpired ? 'expired' : '') + (isToday ? ' today' : '') + '">' +
-                                                '<span class="date">' + formatDateShort(s.date) + '</span>' +
-                                                '<span class="time">' + s.start_time + ' - ' + s.end_time + '</span>' +
-                                                (isToday && w.is_in_schedule ? '<span class="badge badge-schedule-on" style="font-size:0.7em">生效中</span>' : '') +
-                                                (isExpired ? '<span style="font-size:0.7em;color:var(--text-muted)">已過期</span>' : '') +
-                                                '<button class="btn btn-danger btn-sm" onclick="removeScheduleItem(\\'' + g.group_id + '\\',\\'' + w.id + '\\',' + si + ')">刪除</button>' +
-                                                '</div>';
-                                        }).join('')}
-                                    </div>
-                                    <div class="schedule-add-row">
-                                        <input type="date" id="sd-${w.id}" value="${today}" style="max-width:130px;padding:3px">
-                                        <input type="time" id="ss-${w.id}" value="00:00" style="max-width:90px;padding:3px">
-                                        <span style="color:var(--text-muted)">-</span>
-                                        <input type="time" id="se-${w.id}" value="23:59" style="max-width:90px;padding:3px">
-                                        <button class="btn btn-success btn-sm" onclick="addScheduleItem('${g.group_id}', '${w.id}')">添加</button>
-                                    </div>
-                                    <div style="margin-top:8px;display:flex;gap:6px;flex-wrap:wrap">
-                                        <button class="btn btn-outline btn-sm" onclick="clearExpiredSchedules('${g.group_id}', '${w.id}')">清除過期</button>
-                                    </div>
-                                </div>
-                            </div>`;
-                        }).join('') : '<div class="no-data">尚未添加任何 Webhook</div>'}
-                        
-                        <div class="section-title">最近記錄</div>
-                        ${g.history && g.history.length ? g.history.slice(0, 8).map(h => `
-                            <div class="history-item">
-                                <div style="display:flex;justify-content:space-between;flex-wrap:wrap;gap:4px">
-                                    <span>
-                                        <span class="time">${h.time}</span>
-                                        <span class="mode-tag">${h.mode}</span>
-                                        ${h.has_image ? '<span class="badge badge-img">圖</span>' : ''}
-                                    </span>
-                                    <span style="color:var(--text-secondary)">${h.status}</span>
-                                </div>
-                                <div style="color:var(--text-muted);margin-top:2px">${h.content}</div>
-                            </div>
-                        `).join('') : '<div class="no-data">暫無記錄</div>'}
-                        
-                        <div style="margin-top:12px;display:flex;gap:6px;justify-content:flex-end;flex-wrap:wrap">
-                            <button class="btn btn-outline btn-sm" onclick="testGroup('${g.group_id}')">測試群組</button>
-                            <button class="btn btn-danger btn-sm" onclick="deleteGroup('${g.group_id}')">刪除群組</button>
-                        </div>
-                    </div>
-                </div>
-            `).join('');
-        }
 
-        // ====== 排程操作 ======
-        
-        async function getWebhookData(groupId, webhookId) {
-            const res = await (await fetch('/api/stats')).json();
-            for (const g of res.groups) {
-                if (g.group_id === groupId) {
-                    for (const w of g.webhooks) {
-                        if (w.id === webhookId) return w;
-                    }
-                }
-            }
-            return null;
-        }
-        
-        async function toggleScheduleMode(groupId, webhookId, enabled) {
-            const w = await getWebhookData(groupId, webhookId);
-            if (!w) return;
-            const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ schedule_mode: enabled ? 'date_range' : 'off', schedules: w.schedules || [] })
-            })).json();
-            if (res.success) { showSave(); await loadData(true); }
-            else alert(res.message);
-        }
+def _strip_lines(text: str) -> str:
+    """去除每行的縮排與空行及整行的 JS 註解（保留換行，避免影響 JS 自動分號）"""
+    lines = []
+    for line in text.split('\n'):
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
 
-        async function addScheduleItem(groupId, webhookId) {
-            const dateVal = document.getElementById('sd-' + webhookId).value;
-            const startVal = document.getElementById('ss-' + webhookId).value;
-            const endVal = document.getElementById('se-' + webhookId).value;
-            if (!dateVal || !startVal || !endVal) return alert('請填寫完整');
-            
-            const w = await getWebhookData(groupId, webhookId);
-            if (!w) return;
-            
-            let schs = [...(w.schedules || [])];
-            if (schs.some(s => s.date === dateVal && s.start_time === startVal && s.end_time === endVal)) return alert('此排程已存在');
-            schs.push({ date: dateVal, start_time: startVal, end_time: endVal });
-            schs.sort((a, b) => (a.date + a.start_time).localeCompare(b.date + b.start_time));
-            
-            const modeChecked = document.getElementById('sm-' + webhookId).checked;
-            const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ schedule_mode: modeChecked ? 'date_range' : 'off', schedules: schs })
-            })).json();
-            if (res.success) { showSave(); await loadData(true); } else alert(res.message);
-        }
-        
-        async function removeScheduleItem(groupId, webhookId, index) {
-            const w = await getWebhookData(groupId, webhookId);
-            if (!w) return;
-            let schs = [...(w.schedules || [])];
-            schs.splice(index, 1);
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ schedule_mode: w.schedule_mode, schedules: schs })
-            });
-            showSave(); await loadData(true);
-        }
-        
-        async function clearExpiredSchedules(groupId, webhookId) {
-            const w = await getWebhookData(groupId, webhookId);
-            if (!w) return;
-            const today = getTodayStr();
-            let schs = [...(w.schedules || [])];
-            const filtered = schs.filter(s => s.date >= today);
-            if (filtered.length === schs.length) return alert('沒有過期排程');
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/schedule', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ schedule_mode: w.schedule_mode, schedules: filtered })
-            });
-            showSave(); await loadData(true);
-            alert('已清除 ' + (schs.length - filtered.length) + ' 筆過期排程');
-        }
-        
-        // ====== CRUD 操作 ======
-        
-        async function createGroup() {
-            const id = document.getElementById('newGroupId').value.trim();
-            const name = document.getElementById('newGroupName').value.trim();
-            if (!id) return alert('請輸入群組 ID');
-            const res = await (await fetch('/api/group', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ group_id: id, display_name: name || null })
-            })).json();
-            if (res.success) {
-                document.getElementById('newGroupId').value = '';
-                document.getElementById('newGroupName').value = '';
-                openGroups.add(id.toLowerCase());
-                showSave(); await loadData(true);
-            } else alert(res.message);
-        }
-        
-        async function deleteGroup(groupId) {
-            if (!confirm('確定刪除群組 [' + groupId + ']？')) return;
-            await fetch('/api/group/' + groupId, { method: 'DELETE' });
-            openGroups.delete(groupId);
-            showSave(); await loadData(true);
-        }
-        
-        async function setMode(groupId, mode) {
-            const res = await (await fetch('/api/group/' + groupId + '/mode', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ mode })
-            })).json();
-            if (res.success) { showSave(); await loadData(true); } else alert(res.message);
-        }
-        
-        async function addWebhook(groupId) {
-            const name = document.getElementById('wn-' + groupId).value.trim();
-            const type = document.getElementById('wt-' + groupId).value;
-            const url = document.getElementById('wu-' + groupId).value.trim();
-            const fixed = document.getElementById('wf-' + groupId).checked;
-            if (!url) return alert('請輸入 Webhook URL');
-            const res = await (await fetch('/api/group/' + groupId + '/webhook', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ url, name: name || null, webhook_type: type, is_fixed: fixed })
-            })).json();
-            if (res.success) {
-                document.getElementById('wn-' + groupId).value = '';
-                document.getElementById('wu-' + groupId).value = '';
-                document.getElementById('wt-' + groupId).value = 'discord';
-                document.getElementById('wf-' + groupId).checked = false;
-                showSave(); await loadData(true);
-            } else alert(res.message);
-        }
-        
-        async function removeWebhook(groupId, webhookId) {
-            if (!confirm('確定移除？')) return;
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId, { method: 'DELETE' });
-            openSchedulePanels.delete(webhookId);
-            showSave(); await loadData(true);
-        }
-        
-        async function toggleWebhook(groupId, webhookId, enabled) {
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/toggle', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ enabled })
-            });
-            showSave(); await loadData(true);
-        }
-        
-        async function toggleFixed(groupId, webhookId, isFixed) {
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/fixed', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ is_fixed: isFixed })
-            });
-            showSave(); await loadData(true);
-        }
-        
-        async function renameWebhook(groupId, webhookId, currentName) {
-            const newName = prompt('請輸入新名稱:', currentName);
-            if (!newName || newName === currentName) return;
-            await fetch('/api/group/' + groupId + '/webhook/' + webhookId, {
-                method: 'PATCH', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ name: newName })
-            });
-            showSave(); await loadData(true);
-        }
-        
-        async function testWebhook(groupId, webhookId) {
-            const res = await (await fetch('/api/group/' + groupId + '/webhook/' + webhookId + '/test', {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ content: '[測試] ' + new Date().toLocaleTimeString() })
-            })).json();
-            alert(res.success ? '測試成功' : res.message);
-            await loadData(true);
-        }
-        
-        async function testGroup(groupId) {
-            const content = prompt('測試訊息:', '[測試] ' + groupId.toUpperCase());
-            if (!content) return;
-            const res = await (await fetch('/webhook/' + groupId, {
-                method: 'POST', headers: {'Content-Type': 'application/json'},
-                body: JSON.stringify({ content })
-            })).json();
-            alert(res.message);
-            await loadData(true);
-        }
-        
-        // ====== 初始化 ======
-        document.getElementById('newGroupId').addEventListener('keypress', e => { if (e.key === 'Enter') createGroup(); });
-        document.getElementById('newGroupName').addEventListener('keypress', e => { if (e.key === 'Enter') createGroup(); });
-        
-        loadData();
-        setInterval(loadData, 5000);
-    </script>
-</body>
-</html>
-'''
+
+def _minify_html(html: str) -> str:
+    """壓縮管理介面模板：移除 HTML 註解、縮排與空行（啟動時執行一次）"""
+    html = re.sub(r'<!--.*?-->', '', html, flags=re.S)
+    return _strip_lines(html)
+
+
+def _minify_css(css: str) -> str:
+    """壓縮樣式表：移除註解並收斂空白"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css).replace(';}', '}')
+    return css.strip()
+
+
+def _read_template(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _hashed_name(prefix: str, body: bytes, ext: str) -> str:
+    """以內容雜湊命名資源，內容變更時瀏覽器自動取得新檔"""
+    return f"{prefix}.{hashlib.blake2b(body, digest_size=6).hexdigest()}{ext}"
+
+
+def _asset(body: bytes) -> tuple:
+    """預先計算資源的 (原始 bytes, gzip bytes, ETag)"""
+    return body, gzip.compress(body, 9), hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _load_dashboard(mtime: float) -> dict:
+    """
+    讀取管理介面模板、腳本與樣式表
+    
+    回傳 {檔名: (原始 bytes, gzip 壓縮後的 bytes, ETag)}，
+    腳本與樣式表以內容雜湊命名並回填到 HTML 的 __DASHBOARD_JS__ / __DASHBOARD_CSS__ 佔位符
+    """
+    html = _read_template(DASHBOARD_TEMPLATE)
+    script = _read_template(DASHBOARD_SCRIPT)
+    style = _read_template(DASHBOARD_STYLE)
+    if not DEBUG:
+        html = _minify_html(html)
+        script = _strip_lines(script)
+        style = _minify_css(style)
+    
+    script_body = script.encode('utf-8')
+    script_name = _hashed_name('dashboard', script_body, '.js')
+    style_body = style.encode('utf-8')
+    style_name = _hashed_name('dashboard', style_body, '.css')
+    html_body = (html.replace('__DASHBOARD_JS__', script_name)
+                     .replace('__DASHBOARD_CSS__', style_name)
+                     .encode('utf-8'))
+    
+    return {
+        'dashboard.html': _asset(html_body),
+        style_name: _asset(style_body),
+        script_name: _asset(script_body),
+    }
+
+
+def get_dashboard() -> dict:
+    """取得管理介面內容（DEBUG 模式下檔案修改後自動重新載入）"""
+    if DEBUG:
+        mtime = max(os.path.getmtime(p) for p in (DASHBOARD_TEMPLATE, DASHBOARD_SCRIPT, DASHBOARD_STYLE))
+    else:
+        mtime = 0
+    return _load_dashboard(mtime)
+
+
+@lru_cache(maxsize=1)
+def _preload_header(names: tuple) -> str:
+    """組出 Link: rel=preload 標頭，讓瀏覽器在解析 HTML 前就開始下載樣式表與腳本"""
+    return ', '.join(
+        f'</assets/{name}>; rel=preload; as={ASSET_PRELOAD_AS[os.path.splitext(name)[1]]}'
+        for name in names if os.path.splitext(name)[1] in ASSET_PRELOAD_AS
+    )
+
+
+def compressed_response(asset: tuple, mimetype: str) -> Response:
+    """
+    依 Accept-Encoding 回傳預先壓縮或原始內容
+    
+    帶 ETag（弱驗證，gzip 與原始內容視為同一份），瀏覽器重新驗證時內容未變則回 304
+    """
+    body, body_gzip, etag = asset
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif 'gzip' in request.accept_encodings:
+        response = Response(body_gzip, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype=mimetype)
+    response.set_etag(etag, weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+# 啟動時先載入一次，模板遺失時立即報錯
+get_dashboard()
 
 
 # ================================================================================